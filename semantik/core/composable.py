@@ -4,17 +4,98 @@ __all__ = ["Composable", "GeneratingAttribute", "Endpoint"]
 
 
 class Composable:
+    """
+    Everything a composed component contributes to the generated SFC besides its template
+
+    Adding composables (`+=`) only records a reference to the contents of the added composable, the props, imports, components,
+    included renderables and hoisted literals are merged (in the order they were added) the first time one of them is accessed. A
+    composable whose contents were added to another one copies them before it is changed again. Setup code is appended right away.
+    """
+
+    __slots__ = ("_props", "_imports", "_components", "_included", "_literals", "_parts", "_shared", "setup")
 
-    props: dict = {}  #: defineProps values
     setup: code.JSObject or None  #: <script setup> code
-    imports: dict[str, None] = dict()  #: set of import strings
-    components: set = set()  #: components referenced in the template
-    included: set = set()  #: set of other generated components that have already been included
 
     def __init__(self):
-        self.imports = {"import * as vue from 'vue'": None}
+        self._props = dict()  #: defineProps values
+        self._imports = {"import * as vue from 'vue'": None}  #: set of import strings
+        self._components = set()  #: components referenced in the template
+        self._included = set()  #: set of other generated components that have already been included
+        self._literals = dict()  #: literals hoisted out of the template and setup code: name => Literal
+        self._parts = []  #: contents of composables added since the last merge: (props, imports, components, included, literals, parts)
+        self._shared = False  #: whether the containers are referenced by another composable
         self.setup = code.Fragment()
 
+    def _flatten(self):
+        """Merge the contents of the added composables into this one (and make sure the containers can be changed)"""
+        if self._shared:
+            self._props, self._imports = dict(self._props), dict(self._imports)
+            self._components, self._included = set(self._components), set(self._included)
+            self._literals = dict(self._literals)
+            self._shared = False
+        if not self._parts:
+            return
+        stack = self._parts[::-1]
+        self._parts = []
+        while stack:
+            props, imports, components, included, literals, parts = stack.pop()
+            self._props.update(props)
+            self._imports.update(imports)
+            self._components.update(components)
+            self._included.update(included)
+            self._literals.update(literals)
+            stack.extend(reversed(parts))
+
+    @property
+    def props(self) -> dict:
+        self._flatten()
+        return self._props
+
+    @props.setter
+    def props(self, value: dict):
+        self._flatten()
+        self._props = value
+
+    @property
+    def imports(self) -> dict[str, None]:
+        self._flatten()
+        return self._imports
+
+    @imports.setter
+    def imports(self, value: dict[str, None]):
+        self._flatten()
+        self._imports = value
+
+    @property
+    def components(self) -> set:
+        self._flatten()
+        return self._components
+
+    @components.setter
+    def components(self, value: set):
+        self._flatten()
+        self._components = value
+
+    @property
+    def included(self) -> set:
+        self._flatten()
+        return self._included
+
+    @included.setter
+    def included(self, value: set):
+        self._flatten()
+        self._included = value
+
+    @property
+    def literals(self) -> dict:
+        self._flatten()
+        return self._literals
+
+    @literals.setter
+    def literals(self, value: dict):
+        self._flatten()
+        self._literals = value
+
     def __add__(self, other: "Composable"):
         cg = Composable()
         cg += self
@@ -22,11 +103,9 @@ class Composable:
         return cg
 
     def __iadd__(self, other):
-        self.props = self.props | other.props
+        other._shared = True
+        self._parts.append((other._props, other._imports, other._components, other._included, other._literals, tuple(other._parts)))
         self.setup += other.setup
-        self.imports |= other.imports
-        self.components = self.components.union(other.components)
-        self.included = self.included.union(other.included)
         return self
 
     def __repr__(self):
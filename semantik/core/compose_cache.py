@@ -0,0 +1,144 @@
+"""
+Build-scoped cache of composed components
+
+While a `ComposeCache` is active, `Type.use_renderable` reuses the rendered text and the composable of a renderable composed
+earlier (in any view) when its class, its state (parameters, slot children and other instance attributes) and the keyword
+arguments it is used with are the same (and the same literals would be hoisted). Renderables whose state contains values that
+can not be fingerprinted reliably are always composed.
+
+Composing must not depend on anything other than the state of the instance and the keyword arguments (e.g. on the parent):
+templates that refer to a `parent` (`type.parent` or a `parent` variable) are never cached and neither are classes that
+override `compose` (which may read anything), unless they opt in by setting `_compose_cache = True`. Classes opt out
+altogether by setting `_compose_cache = False`.
+"""
+
+import enum
+import functools
+import pathlib
+
+import jinja2
+from jinja2 import nodes
+
+from .template import environment, is_static
+from ..generate.literals import active_hoister
+
+__all__ = ["ComposeCache", "active_cache"]
+
+_active = []  #: stack of active caches
+
+
+def active_cache() -> "ComposeCache or None":
+    """The innermost active compose cache (or None)"""
+    return _active[-1] if _active else None
+
+
+class _Uncacheable(Exception):
+    pass
+
+
+@functools.lru_cache(maxsize=1024)
+def overrides_compose(cls: type) -> bool:
+    """Whether a class composes with anything other than `Type.compose` (which only depends on the template and the state)"""
+    from .type import Type
+
+    return getattr(cls, "compose", None) is not Type.compose
+
+
+@functools.lru_cache(maxsize=1024)
+def refers_to_parent(text: str) -> bool:
+    """Whether a template refers to a parent (a `parent` variable, attribute or item in its expressions)"""
+    if is_static(text):
+        return False
+    try:
+        ast = environment().parse(text)
+    except jinja2.TemplateSyntaxError:
+        return True
+    for node in ast.find_all((nodes.Name, nodes.Getattr, nodes.Getitem)):
+        if isinstance(node, nodes.Name) and node.name == "parent":
+            return True
+        if isinstance(node, nodes.Getattr) and node.attr == "parent":
+            return True
+        if isinstance(node, nodes.Getitem) and isinstance(node.arg, nodes.Const) and node.arg.value == "parent":
+            return True
+    return False
+
+
+_ATOMS = (type(None), bool, int, float, complex, str, bytes, enum.Enum, pathlib.PurePath)
+
+
+def _fingerprint(value, seen: set):
+    if isinstance(value, _ATOMS):
+        return value.__class__, value
+    if isinstance(value, type):
+        return type, value
+    if isinstance(value, (list, tuple)):
+        return value.__class__, tuple(_fingerprint(i, seen) for i in value)
+    if isinstance(value, dict):
+        return dict, tuple((_fingerprint(k, seen), _fingerprint(v, seen)) for k, v in value.items())
+    if isinstance(value, (set, frozenset)):
+        return frozenset, frozenset(_fingerprint(i, seen) for i in value)
+    if hasattr(value, "compose") and hasattr(value, "__dict__"):
+        # a nested Type instance
+        if id(value) in seen:
+            raise _Uncacheable()
+        seen.add(id(value))
+        state = tuple((k, _fingerprint(v, seen)) for k, v in sorted(vars(value).items()) if k not in ("parent", "_pending_slots"))
+        pending = tuple(sorted(vars(value).get("_pending_slots", {}).items()))
+        seen.discard(id(value))
+        return value.__class__, state, pending
+    raise _Uncacheable()
+
+
+class ComposeCache:
+    """
+    Cache of (composable, rendered text) by renderable fingerprint
+
+    Use as a context manager to make it the active cache for `Type.use_renderable`.
+    """
+
+    def __init__(self):
+        self.entries = dict()
+        self.stats = dict(hits=0, misses=0, uncacheable=0)
+
+    def key(self, renderable, kwargs: dict):
+        """The fingerprint of a renderable used with kwargs (None if it can not be cached)"""
+        cls = renderable.__class__
+        template = getattr(renderable, "template", None)
+        opt_in = getattr(cls, "_compose_cache", None)
+        if opt_in is False or (opt_in is None and overrides_compose(cls)) or (isinstance(template, str) and refers_to_parent(template)):
+            self.stats["uncacheable"] += 1
+            return None
+        hoister = active_hoister()
+        try:
+            return _fingerprint(renderable, set()), _fingerprint(kwargs, set()), hoister.threshold if hoister else None
+        except (_Uncacheable, TypeError):
+            self.stats["uncacheable"] += 1
+            return None
+
+    def get(self, key):
+        """The cached (composable, rendered text) for a key or None"""
+        hit = self.entries.get(key)
+        self.stats["hits" if hit else "misses"] += 1
+        return hit
+
+    def put(self, key, composable, rendered: str):
+        self.entries[key] = (composable, rendered)
+
+    def invalidate(self, cls: type = None):
+        """Drop all entries (or only those of a class and its subclasses)"""
+        if cls is None:
+            self.entries.clear()
+        else:
+            for key in [k for k in self.entries if issubclass(k[0][0], cls)]:
+                del self.entries[key]
+
+    def report(self) -> dict:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return dict(self.stats, entries=len(self.entries), hit_rate=self.stats["hits"] / lookups if lookups else None)
+
+    def __enter__(self):
+        _active.append(self)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        _active.remove(self)
@@ -1,19 +1,32 @@
 from pathlib import Path
+import concurrent.futures
+import hashlib
+import json
 import warnings
 import re
 
 from ..utils.cases import *
+from ..utils.cache import cache_dir, write_atomic
+from ..utils.listing import list_files
 from . import type
 
 __all__ = ["resolver", "DirectoryResolver", "GeneratedResolver"]
 
 
-def resolver(func):
+def resolver(func=None, priority: int = 0):
     """
     Decorator to register a function to resolve a tag name to an import statement
+
+    :param priority: resolvers with a higher priority are tried first (use as `@resolver(priority=...)`)
     """
-    type.TypeMetaclass.resolvers.append(func)
-    return func
+
+    def register(func):
+        if priority:
+            func.priority = priority
+        type.TypeMetaclass.resolvers.add(func)
+        return func
+
+    return register if func is None else register(func)
 
 
 def tag_to_file_names(tag_name):
@@ -32,14 +45,38 @@ def tag_to_file_names(tag_name):
 class BaseResolver:
     """
     Resolver for a collections of components
+
+    Resolvers take part in the resolver index by listing the spellings they resolve (`index`) and checking a tag against one of
+    them (`index_resolve`). Call `invalidate` when what a resolver resolves changes.
+
+    Resolvers register themselves when created. Used as a context manager a resolver is removed from the chain again at the end
+    of the `with` block.
     """
 
+    priority = 0  #: resolvers with a higher priority are tried first
+
+    def index(self):
+        """Iterable of (spelling, value) of everything this resolver resolves"""
+        return ()
+
+    def index_resolve(self, tag_name, spelling, value):
+        """
+        Resolve a tag name using one of the entries from `index` (with the same normalised spelling)
+
+        :return: (canonical name, path) or None if the entry does not match the tag
+        """
+        return None
+
+    @staticmethod
+    def invalidate():
+        type.TypeMetaclass.resolvers.invalidate()
+
     def __enter__(self):
-        type.TypeMetaclass.resolvers.append(self)
+        type.TypeMetaclass.resolvers.add(self)
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        type.TypeMetaclass.resolvers.remove(self)
+        type.TypeMetaclass.resolvers.discard(self)
 
 
 class DirectoryResolver(BaseResolver):
@@ -47,10 +84,34 @@ class DirectoryResolver(BaseResolver):
     Resolver for a directory of components
     """
 
-    def __init__(self, directory: str or Path):
+    def __init__(self, directory: str or Path, cache: bool = True):
+        """
+        :param directory: directory containing the components (scanned when the resolver is first used)
+        :param cache: keep a listing of the directory on disk and only re-read directories that changed since it was saved
+        """
         self.directory = Path(directory) if isinstance(directory, str) else directory
-        self.files = {i.stem: i for i in self.directory.glob("**/*.vue")} | {i.stem: i for i in self.directory.glob("**/*.js")}
-        type.TypeMetaclass.resolvers.append(self)
+        self.cache = cache
+        self._files = None
+        type.TypeMetaclass.resolvers.add(self)
+
+    @property
+    def files(self) -> dict[str, Path]:
+        """Components in the directory by file stem (.js files take precedence over .vue files)"""
+        if self._files is None:
+            self._files = {i.stem: i for i in list_files(self.directory, (".vue", ".js"), cache=self.cache)}
+        return self._files
+
+    def rescan(self):
+        """Re-read the list of components in the directory (the next time it is needed)"""
+        self._files = None
+        self.invalidate()
+
+    def index(self):
+        return self.files.items()
+
+    def index_resolve(self, tag_name, spelling, value):
+        if spelling in tag_to_file_names(tag_name):
+            return kebab_to_pascal(tag_name) if "-" in tag_name else tag_name, str(value)
 
     def __call__(self, tag_name):
         candidates = tag_to_file_names(tag_name)
@@ -62,6 +123,13 @@ class DirectoryResolver(BaseResolver):
 
 class GeneratedResolver(DirectoryResolver):
 
+    def index(self):
+        return [(c, None) for c in type.TypeMetaclass.by_tag] + [(c, None) for c in type.TypeMetaclass.by_class_name]
+
+    def index_resolve(self, tag_name, spelling, value):
+        if spelling == tag_name:
+            return self(tag_name)
+
     def __call__(self, c):
         if c in type.TypeMetaclass.by_tag or c in type.TypeMetaclass.by_class_name:
             target = type.TypeMetaclass.by_tag.get(c, None) or type.TypeMetaclass.by_class_name.get(c, None)
@@ -77,41 +145,97 @@ class DevExtremeResolver(BaseResolver):
     """
 
     PAT_EXPORTS = re.compile(r"export \{(.*)}")
+    INDEX_VERSION = 1
+
+    def _exports(self, file: Path) -> list[str]:
+        """Names exported by one .js file"""
+        text = file.open("rt").read()
+        return [x.strip() for i in self.PAT_EXPORTS.findall(text) for x in i.split(",")]
+
+    def _merge(self, file: Path, components: list[str]):
+        for component in components:
+            cn = component.lower()
+            if not cn.startswith("dx") or "_" in cn:
+                # an export of something other than a component
+                continue
+            if cn in self.components:
+                # the component name already exists (this is an ambiguous name that appears in different .js files so we will add a prefix)
+                old_component, old_file = self.components[cn]
+                old_prefix = "Dx" + kebab_to_pascal(old_file.stem)
+                new_prefix = "Dx" + kebab_to_pascal(file.stem)
+                if old_component != old_prefix:
+                    # the old component is not the canonical one, add a prefix to its entry in self.components
+                    del self.components[cn]
+                    self.components[old_prefix.lower() + old_component[2:].lower()] = (old_prefix + old_component[2:], old_file)
+                if component != new_prefix:
+                    # the new component is not the canonical one, add a prefix to its entry in self.components
+                    self.components[new_prefix.lower() + component[2:].lower()] = (component, file)
+                else:
+                    # the new component *is* the canonical one so it gets to replace the old one as the one accessed with no prefix
+                    self.components[cn] = (component, file)
+            else:
+                self.components[cn] = (component, file)
+
+    def _index_key(self) -> str:
+        """The version of the installed package the directory belongs to or, failing that, a signature of the .js files in it"""
+        for parent in [self.directory, *self.directory.parents]:
+            package = parent / "package.json"
+            if package.is_file() and "node_modules" in parent.parts:
+                try:
+                    meta = json.loads(package.read_text())
+                    return f"package:{meta.get('name')}@{meta.get('version')}:{package.stat().st_mtime_ns}"
+                except (OSError, ValueError):
+                    break
+        h = hashlib.sha256()
+        for file in sorted(self.directory.glob("**/*.js")):
+            st = file.stat()
+            h.update(f"{file.relative_to(self.directory)}\0{st.st_size}\0{st.st_mtime_ns}\n".encode())
+        return f"files:{h.hexdigest()}"
 
     def read(self):
-        for file in list(self.directory.glob("**/*.js")):
-            text = file.open("rt").read()
-            for i in self.PAT_EXPORTS.findall(text):
-                for component in [x.strip() for x in i.split(",")]:
-                    cn = component.lower()
-                    if not cn.startswith("dx") or "_" in cn:
-                        # an export of something other than a component
-                        continue
-                    if cn in self.components:
-                        # the component name already exists (this is an ambiguous name that appears in different .js files so we will add a prefix)
-                        old_component, old_file = self.components[cn]
-                        old_prefix = "Dx" + kebab_to_pascal(old_file.stem)
-                        new_prefix = "Dx" + kebab_to_pascal(file.stem)
-                        if old_component != old_prefix:
-                            # the old component is not the canonical one, add a prefix to its entry in self.components
-                            del self.components[cn]
-                            self.components[old_prefix.lower() + old_component[2:].lower()] = (old_prefix + old_component[2:], old_file)
-                        if component != new_prefix:
-                            # the new component is not the canonical one, add a prefix to its entry in self.components
-                            self.components[new_prefix.lower() + component[2:].lower()] = (component, file)
-                        else:
-                            # the new component *is* the canonical one so it gets to replace the old one as the one accessed with no prefix
-                            self.components[cn] = (component, file)
-                    else:
-                        self.components[cn] = (component, file)
+        """
+        Build the index of exported components (or load it from the on-disk cache if the package did not change)
+
+        The .js files are read on a thread pool: this overlaps the file reads (parallel I/O), the regex scans of the exports
+        hold the GIL and are not run in parallel.
+        """
+        key = self._index_key()
+        cache_file = cache_dir("devextreme") / (hashlib.sha256(str(self.directory.resolve()).encode()).hexdigest() + ".json")
+        try:
+            cached = json.loads(cache_file.read_text())
+        except (OSError, ValueError):
+            cached = dict()
+
+        if cached.get("version") == self.INDEX_VERSION and cached.get("key") == key:
+            self.components = {cn: (component, self.directory / file) for cn, (component, file) in cached["components"].items()}
+        else:
+            files = list(self.directory.glob("**/*.js"))
+            with concurrent.futures.ThreadPoolExecutor() as executor:
+                exports = list(executor.map(self._exports, files))
+            # merging must be done in glob order (disambiguation depends on which file exported a name first)
+            for file, components in zip(files, exports):
+                self._merge(file, components)
+            components = {cn: (component, str(file.relative_to(self.directory))) for cn, (component, file) in self.components.items()}
+            try:
+                write_atomic(cache_file, json.dumps(dict(version=self.INDEX_VERSION, key=key, components=components)))
+            except OSError:
+                pass
+        self.invalidate()
 
     def __init__(self, directory: str or Path):
         self.directory = Path(directory) if isinstance(directory, str) else directory
-        type.TypeMetaclass.resolvers.append(self)
+        type.TypeMetaclass.resolvers.add(self)
         self.components = dict()
         self.read()
         pass
 
+    def index(self):
+        return self.components.items()
+
+    def index_resolve(self, tag_name, spelling, value):
+        if spelling in tag_to_file_names(tag_name):
+            return value
+
     def __call__(self, tag_name):
         candidates = tag_to_file_names(tag_name)
         for candidate in candidates:
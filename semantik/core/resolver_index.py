@@ -0,0 +1,236 @@
+"""
+The chain of registered resolvers and the index over it
+
+The chain holds each resolver at most once (by identity). Resolvers are tried by descending `priority` attribute (0 when
+missing), resolvers with the same priority in the order they were added. Resolvers used as context managers (or activated with
+`ResolverChain.activate`) are only registered for the duration of the `with` block. The chain records the module that
+registered each resolver (`registered_by`) so the resolvers a module creates at import time can be dropped before it is reloaded
+(`purge`).
+
+Resolvers that can list what they resolve (they implement `index` and `index_resolve`) are merged into a single hash index
+keyed by a normalised spelling of the tag name (no dashes, lower case: all spellings `tag_to_file_names` tries for a tag share
+it). Other resolvers (e.g. plain functions registered with @resolver) are called in their place in the resolver order.
+
+Results, including misses, are cached per tag so that after the first lookup resolving a tag is a single dict lookup. The
+index and the cache are dropped whenever the resolver list changes, the Type registry changes or a resolver calls
+`invalidate`.
+"""
+
+import contextlib
+import sys
+
+__all__ = ["ResolverChain", "normalise_tag"]
+
+_MISSING = object()
+
+
+def normalise_tag(tag_name: str) -> str:
+    """The key shared by all spellings of a tag name"""
+    return tag_name.replace("-", "").lower()
+
+
+def _indexable(r) -> bool:
+    """
+    Whether a resolver can be used through the index
+
+    Plain functions can not, neither can resolvers whose class overrides `__call__` without also providing `index_resolve` (the
+    inherited index would not match what the resolver actually resolves).
+    """
+    if not hasattr(r, "index_resolve"):
+        return False
+    mro = type(r).__mro__
+    call = next(c for c in mro if "__call__" in c.__dict__)
+    index = next(c for c in mro if "index_resolve" in c.__dict__)
+    return issubclass(index, call)
+
+
+_INTERNAL_MODULES = {__name__, "semantik.core.resolve", "contextlib"}
+
+
+def _registering_module(resolver) -> str or None:
+    """Name of the module whose code created (or registered) a resolver: the first caller outside the resolver machinery"""
+    frame = sys._getframe(1)
+    while frame is not None:
+        name = frame.f_globals.get("__name__")
+        if name not in _INTERNAL_MODULES and not (frame.f_code.co_name == "__init__" and frame.f_locals.get("self") is resolver):
+            return name
+        frame = frame.f_back
+    return None
+
+
+def _priority(r) -> int or float:
+    return getattr(r, "priority", 0)
+
+
+class ResolverChain(list):
+    """
+    The resolvers in the order they are tried, with an index of what they resolve
+
+    Behaves like a list but adding a resolver that is already in the chain does nothing, the order is always kept sorted by
+    priority and any change invalidates the index.
+    """
+
+    def __init__(self, resolvers=()):
+        super().__init__()
+        self.buckets = None  #: normalised tag => [(resolver position, spelling, value)]
+        self.indexable = []  #: for each resolver, whether it is resolved through the index
+        self.cache = dict()  #: tag => (canonical, path) or None
+        self.stats = dict(hits=0, misses=0, builds=0)
+        self.extend(resolvers)
+
+    def invalidate(self):
+        """Drop the index and the cached results (call when what a resolver resolves changes)"""
+        self.buckets = None
+        self.cache = dict()
+
+    def _changed(self):
+        list.sort(self, key=lambda r: -_priority(r))
+        self.invalidate()
+
+    #
+    # adding and removing resolvers
+    #
+
+    def add(self, resolver) -> bool:
+        """
+        Add a resolver (after the resolvers with the same or a higher priority)
+
+        :return: whether the resolver was added (False if it was already in the chain)
+        """
+        if any(r is resolver for r in self):
+            return False
+        if getattr(resolver, "registered_by", None) is None:
+            try:
+                resolver.registered_by = _registering_module(resolver)
+            except AttributeError:
+                pass
+        list.append(self, resolver)
+        self._changed()
+        return True
+
+    def discard(self, resolver) -> bool:
+        """
+        Remove a resolver if it is in the chain
+
+        :return: whether the resolver was removed
+        """
+        for n, r in enumerate(self):
+            if r is resolver:
+                list.__delitem__(self, n)
+                self.invalidate()
+                return True
+        return False
+
+    def purge(self, module_name: str) -> list:
+        """
+        Remove the resolvers registered by a module (before it is reloaded and registers them again)
+
+        :return: the removed resolvers
+        """
+        removed = [r for r in self if getattr(r, "registered_by", None) == module_name]
+        for r in removed:
+            self.discard(r)
+        return removed
+
+    @contextlib.contextmanager
+    def activate(self, *resolvers):
+        """Context manager registering resolvers for the duration of the `with` block (resolvers that were already in the chain stay)"""
+        added = [r for r in resolvers if self.add(r)]
+        try:
+            yield self
+        finally:
+            for r in added:
+                self.discard(r)
+
+    #
+    # list API
+    #
+
+    def append(self, resolver):
+        self.add(resolver)
+
+    def extend(self, resolvers):
+        for r in resolvers:
+            self.add(r)
+
+    def __iadd__(self, resolvers):
+        self.extend(resolvers)
+        return self
+
+    def insert(self, index, resolver):
+        """Insert a resolver before the one at `index` (within its priority the resolver keeps this position)"""
+        if any(r is resolver for r in self):
+            return
+        list.insert(self, index, resolver)
+        self._changed()
+
+    def remove(self, resolver):
+        if not self.discard(resolver):
+            raise ValueError(f"{resolver!r} is not in the resolver chain")
+
+    def pop(self, index=-1):
+        r = list.pop(self, index)
+        self.invalidate()
+        return r
+
+    def clear(self):
+        list.clear(self)
+        self.invalidate()
+
+    def __setitem__(self, index, value):
+        raise TypeError("Resolvers can not be replaced in place, use add and discard")
+
+    def __delitem__(self, index):
+        list.__delitem__(self, index)
+        self.invalidate()
+
+    def sort(self, *args, **kwargs):
+        raise TypeError("The order of resolvers is determined by their priority")
+
+    def reverse(self):
+        raise TypeError("The order of resolvers is determined by their priority")
+
+    #
+    # resolving
+    #
+
+    def _build(self):
+        buckets = dict()
+        self.indexable = [_indexable(r) for r in self]
+        for position, r in enumerate(self):
+            if self.indexable[position]:
+                for spelling, value in r.index():
+                    buckets.setdefault(normalise_tag(spelling), []).append((position, spelling, value))
+        self.buckets = buckets
+        self.stats["builds"] += 1
+
+    def _resolve(self, tag_name: str):
+        if self.buckets is None:
+            self._build()
+        entries = self.buckets.get(normalise_tag(tag_name), ())
+        for position, r in enumerate(self):
+            if self.indexable[position]:
+                for entry_position, spelling, value in entries:
+                    if entry_position == position:
+                        resolved = r.index_resolve(tag_name, spelling, value)
+                        if resolved:
+                            return resolved
+            else:
+                resolved = r(tag_name)
+                if resolved:
+                    return resolved
+        return None
+
+    def lookup(self, tag_name: str):
+        """
+        Resolve a tag name
+
+        :return: (canonical name, path) from the first resolver that resolves the tag or None
+        """
+        resolved = self.cache.get(tag_name, _MISSING)
+        if resolved is _MISSING:
+            self.stats["misses"] += 1
+            resolved = self.cache[tag_name] = self._resolve(tag_name)
+        else:
+            self.stats["hits"] += 1
+        return resolved
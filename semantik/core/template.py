@@ -0,0 +1,207 @@
+"""
+Compiled template cache
+
+All Types share one jinja environment and each distinct template is compiled once per process: compiled templates are kept
+in an LRU cache keyed by the class and the template text.
+
+Templates without any template syntax are not compiled at all: `render_static` gives the same output jinja would.
+
+Templates can also be compiled ahead of time into a package of python modules (or a zip of it) with `precompile`. After
+`use_precompiled`, templates are loaded from there instead of being compiled. Precompiled templates are named after a hash of
+their text so a template that changed since it was precompiled is simply not found and is compiled as usual.
+"""
+
+import collections
+import hashlib
+import inspect
+import json
+import threading
+import warnings
+from pathlib import Path
+
+import jinja2
+
+__all__ = [
+    "environment",
+    "compile_template",
+    "is_static",
+    "render_static",
+    "TemplateCache",
+    "templates",
+    "compose_stats",
+    "precompile",
+    "use_precompiled",
+]
+
+PRECOMPILED_MANIFEST = "semantik-templates.json"
+
+_environment = None
+_precompiled = None  #: jinja2.ModuleLoader for the precompiled templates in use
+
+compose_stats = dict(static=0, rendered=0)  #: number of composes that skipped the template engine and that rendered a template
+
+
+def environment() -> jinja2.Environment:
+    """The jinja environment used to compile Type templates"""
+    global _environment
+    if _environment is None:
+        _environment = jinja2.Environment(
+            autoescape=False,
+            trim_blocks=True,
+            lstrip_blocks=True,
+            variable_start_string="{&",
+            variable_end_string="&}",
+            extensions=["jinja2.ext.i18n"],
+            undefined=jinja2.StrictUndefined,
+        )
+    return _environment
+
+
+def is_static(text: str) -> bool:
+    """Whether a template contains no template syntax (rendering it does not depend on the context)"""
+    return "{&" not in text and "{%" not in text and "{#" not in text and "\r" not in text
+
+
+def render_static(text: str) -> str:
+    """Render a static template: jinja only drops a single trailing newline (keep_trailing_newline is off)"""
+    return text[:-1] if text.endswith("\n") else text
+
+
+def template_owner(cls: type, text: str) -> type:
+    """The class that defines a template (subclasses inheriting a template share its compiled form)"""
+    for c in cls.__mro__:
+        if "template" in c.__dict__:
+            return c if c.__dict__["template"] == text else cls
+    return cls
+
+
+def _file_name(cls: type) -> str:
+    return inspect.getfile(cls) + f"/{cls.__name__}/template"
+
+
+def template_name(cls: type, text: str) -> str:
+    """Name of a template in a precompiled template package"""
+    cls = template_owner(cls, text)
+    return f"{cls.__module__}.{cls.__qualname__}:{hashlib.sha256(text.encode()).hexdigest()}"
+
+
+def compile_template(cls: type, text: str) -> jinja2.Template:
+    """Compile the template of a Type class (or load it from the precompiled templates)"""
+    cls = template_owner(cls, text)
+    env = environment()
+    if _precompiled is not None:
+        try:
+            return _precompiled.load(env, template_name(cls, text))
+        except jinja2.TemplateNotFound:
+            pass
+    compiled = env.compile(text, name=f"{cls.__name__}", filename=_file_name(cls))
+    return jinja2.Template.from_code(env, compiled, {}, None)
+
+
+class TemplateCache:
+    """
+    LRU cache of compiled templates
+
+    :param max_size: maximum number of compiled templates to keep
+    """
+
+    def __init__(self, max_size: int = 1024):
+        self.max_size = max_size
+        self.templates = collections.OrderedDict()
+        self.stats = dict(hits=0, misses=0, evictions=0)
+        self.lock = threading.Lock()
+
+    def get(self, cls: type, text: str) -> jinja2.Template:
+        """The compiled template for a class (compiled on first use, shared with the classes inheriting the template)"""
+        key = (template_owner(cls, text), text)
+        with self.lock:
+            template = self.templates.get(key)
+            if template is not None:
+                self.templates.move_to_end(key)
+                self.stats["hits"] += 1
+                return template
+
+        template = compile_template(cls, text)
+        with self.lock:
+            self.stats["misses"] += 1
+            self.templates[key] = template
+            while len(self.templates) > self.max_size:
+                self.templates.popitem(last=False)
+                self.stats["evictions"] += 1
+        return template
+
+    def clear(self):
+        with self.lock:
+            self.templates.clear()
+
+
+templates = TemplateCache()  #: the process wide cache used by Type.compose
+
+
+#
+# ahead of time compilation
+#
+
+
+class _SourceLoader(jinja2.BaseLoader):
+    def __init__(self, sources: dict[str, str]):
+        self.sources = sources
+
+    def get_source(self, environment, name):
+        if name not in self.sources:
+            raise jinja2.TemplateNotFound(name)
+        return self.sources[name]
+
+    def list_templates(self):
+        return sorted(self.sources)
+
+
+def precompile(target: str or Path, classes: list[type] = None, zip: bool = False) -> int:
+    """
+    Compile the templates of Type classes into a package of python modules
+
+    :param target: directory (or zip file if `zip`) to write the compiled templates to
+    :param classes: classes whose templates to compile (default: all registered Types)
+    :param zip: write a zip file instead of a directory
+    :return: number of templates compiled
+    """
+    from .type import TypeMetaclass
+
+    if classes is None:
+        classes = list(TypeMetaclass.by_class_name.values()) + [c for c in TypeMetaclass.to_generate if c not in TypeMetaclass.by_class_name.values()]
+    sources = dict()
+    for cls in classes:
+        text = cls.template
+        if isinstance(text, str):
+            sources[template_name(cls, text)] = (text, _file_name(template_owner(cls, text)), lambda: True)
+
+    target = Path(target)
+    env = environment().overlay(loader=_SourceLoader(sources))
+    env.compile_templates(str(target), zip="deflated" if zip else None, ignore_errors=False, log_function=lambda x: None)
+    manifest = json.dumps(dict(jinja2=jinja2.__version__, templates=sorted(sources)))
+    (target.with_name(target.name + ".json") if zip else target / PRECOMPILED_MANIFEST).write_text(manifest)
+    return len(sources)
+
+
+def use_precompiled(path: str or Path or None):
+    """
+    Load templates from a package written by `precompile` (templates not found there are compiled as usual)
+
+    :param path: directory or zip file written by `precompile` (None stops using precompiled templates)
+    """
+    global _precompiled
+    templates.clear()
+    if path is None:
+        _precompiled = None
+        return
+    path = Path(path)
+    manifest = path.with_name(path.name + ".json") if path.is_file() else path / PRECOMPILED_MANIFEST
+    try:
+        version = json.loads(manifest.read_text()).get("jinja2")
+    except (OSError, ValueError):
+        version = None
+    if version != jinja2.__version__:
+        warnings.warn(f"Precompiled templates in {path} are missing or were compiled with another jinja2 version, ignoring them")
+        _precompiled = None
+        return
+    _precompiled = jinja2.ModuleLoader(str(path))
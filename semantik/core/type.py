@@ -5,13 +5,15 @@ import warnings
 from pathlib import Path
 from collections import ChainMap, defaultdict
 
-import jinja2
-
 from . import composable
+from .template import templates, compose_stats, is_static, render_static
+from .resolver_index import ResolverChain
+from .compose_cache import active_cache
 from ..generate.javascript import dumps, format_object
+from ..generate.literals import active_hoister
 from ..utils.cases import *
 from ..utils.classproperty import classproperty
-from ..utils.auto_importer import ModifyingTemplateParser
+from ..utils.auto_importer import scan_components
 
 __all__ = ["Type", "parameter", "slot", "as_slot", "generate", "route", "NO_DEFAULT"]
 
@@ -22,6 +24,50 @@ def all_annotations(cls) -> ChainMap:
     return ChainMap(*(c.__annotations__ for c in cls.__mro__ if "__annotations__" in c.__dict__))
 
 
+class Schema(t_.NamedTuple):
+    """What instantiating a Type class has to do (computed once per class)"""
+
+    parameters: tuple[tuple[str, "Parameter"], ...]  #: (name, Parameter) in annotation order
+    slots: tuple[tuple[str, bool, tuple[type, ...]], ...]  #: (name, multiple, child classes sorted by _order) of slots with children
+    epoch: int  #: TypeMetaclass.schema_epoch when the schema was computed
+
+
+def _build_schema(cls) -> Schema:
+    ann = all_annotations(cls)
+
+    parameters = []
+    for k, a in ann.items():
+        if getattr(a, "__metadata__", None) and isinstance(a.__metadata__[0], Parameter):
+            parameters.append((k, a.__metadata__[0]))
+    done = {k for k, _ in parameters}
+
+    # nested Type classes grouped by slot name
+    children = defaultdict(list)
+    for k, v in inspect.getmembers(cls, lambda o: isinstance(o, TypeMetaclass)):
+        if k not in done:
+            children[getattr(v, "slot_name", "default")].append(v)
+
+    slots = []
+    for k, a in ann.items():
+        if not (getattr(a, "__metadata__", None) and isinstance(a.__metadata__[0], Slot)) or k not in children:
+            continue
+        if typing_utils.issubtype(a.__args__[0], list[Type]):
+            slots.append((k, True, tuple(sorted(children[k], key=lambda o: o._order))))
+        elif typing_utils.issubtype(a.__args__[0], Type) and k != "parent":
+            slots.append((k, False, tuple(children[k])))
+
+    return Schema(tuple(parameters), tuple(slots), TypeMetaclass.schema_epoch)
+
+
+def get_schema(cls) -> Schema:
+    """The parameters and slots of a Type class"""
+    schema = cls.__dict__.get("_schema")
+    if schema is None or schema.epoch != TypeMetaclass.schema_epoch:
+        schema = _build_schema(cls)
+        type.__setattr__(cls, "_schema", schema)
+    return schema
+
+
 class TypeMetaclass(type):
     """
     Metaclass for types
@@ -36,9 +82,10 @@ class TypeMetaclass(type):
     instances = {}
     context = {}
     in_reload = False
-    resolvers: list[callable] = []  #: a list of functions to resolve a tag name and return an import statement to import the components referenced
+    resolvers: ResolverChain = ResolverChain()  #: the functions and resolver objects that resolve a tag name to the component to import
     to_generate: dict[t_.Type["Type"], str or None] = dict()
     order = 0
+    schema_epoch = 0  #: incremented when a change to a class can change the schema of any class
 
     def __new__(mcs: t_.Type["Type"], klass_name: str, bases: tuple[t_.Type], klass_dict: dict) -> "Type":
 
@@ -57,22 +104,56 @@ class TypeMetaclass(type):
                     f"({mcs.by_tag[tag_name].__module__}) & {klass!r} in {klass.__module__})"
                 )
 
+        # templates without template syntax are rendered without the template engine (see Type.compose)
+        template = getattr(klass, "template", None)
+        klass._static_template = template if isinstance(template, str) and is_static(template) else None
+
         mcs.by_class_name[class_name] = klass
         mcs.by_tag[tag_name] = klass
+        mcs.resolvers.invalidate()
+        get_schema(klass)
 
         return klass
 
+    def __setattr__(cls, name, value):
+        old = cls.__dict__.get(name)
+        super().__setattr__(name, value)
+        if name in ("slot_name", "__annotations__") or isinstance(value, TypeMetaclass) or isinstance(old, TypeMetaclass):
+            TypeMetaclass.schema_epoch += 1
+
+    def __delattr__(cls, name):
+        old = cls.__dict__.get(name)
+        super().__delattr__(name)
+        if name in ("slot_name", "__annotations__") or isinstance(old, TypeMetaclass):
+            TypeMetaclass.schema_epoch += 1
+
+    @classmethod
+    def purge(mcs, module_name: str):
+        """
+        Remove all classes defined in a module and the resolvers it registered from the registry (before the module is reloaded)
+        """
+        for registry in (mcs.by_tag, mcs.by_class_name, mcs.to_generate):
+            for k, v in list(registry.items()):
+                cls = v if isinstance(v, type) else k
+                if cls.__module__ == module_name:
+                    del registry[k]
+        mcs.resolvers.purge(module_name)
+        mcs.resolvers.invalidate()
+
     @classmethod
     def resolve(mcs, components: set[str] or list[str]) -> dict[(str, Path), None]:
+        """
+        Resolve tag names to the components to import
+
+        :return: dict of canonical name => path, sorted by canonical name (so generated imports do not depend on set order)
+        """
         out = dict()
-        for c in components:
-            for r in mcs.resolvers:
-                resolved = r(c)
-                if resolved:
-                    canonical, path = resolved
-                    out[canonical] = path
-                    break
-        return out
+        for c in sorted(components):
+            resolved = mcs.resolvers.lookup(c)
+            if resolved:
+                canonical, path = resolved
+                out[canonical] = path
+        return dict(sorted(out.items()))
 
     def __repr__(cls):
         return "|Type class %s %s|" % (cls.class_name, hex(id(cls))[-4:])
@@ -86,6 +167,9 @@ class NO_DEFAULT:
     pass
 
 
+_ABSENT = object()
+
+
 class Parameter:
 
     def __init__(self, required=False, default=NO_DEFAULT):
@@ -128,6 +212,8 @@ class Type(metaclass=TypeMetaclass):
 
     _location: str or Path or None = None  #: location to save the generated component (overrides default generation location)
     _route: dict[str, t_.Any] or None = None  #: details on the route to use for this component
+    _lazy_slots: bool = False  #: instantiate slot children on first access (set on Type to make all slots lazy)
+    _compose_cache: bool or None = None  #: whether composed instances may be reused by a ComposeCache (None: unless compose is overridden)
 
     @classproperty
     def class_name(self):
@@ -141,75 +227,58 @@ class Type(metaclass=TypeMetaclass):
 
     def __init__(self, parent: "Type" or t_.Type["Type"] = None):
         self.parent = parent
-        ann = all_annotations(self.__class__)
+        schema = get_schema(self.__class__)
 
         #
         # Step 1: Process parameters (type-annotated attributes marked with the Parameter annotation)
         #
-        done = set()
-        for k, a in ann.items():
-
-            if not (getattr(a, "__metadata__", None) and isinstance(a.__metadata__[0], Parameter)):
-                continue
-
-            done.add(k)
-            if not hasattr(self, k):
+        for k, p in schema.parameters:
+            v = getattr(self, k, _ABSENT)
+            if v is _ABSENT:
                 continue
-            v = getattr(self, k, NO_DEFAULT)
-            processed = a.__metadata__[0].process(self, v)
+            processed = p.process(self, v)
             if processed is not NO_DEFAULT:
                 setattr(self, k, processed)
 
         #
         # Step 2: Process slots (type-annotated attributes marked with the Slot annotation)
         #
-
-        # First gather all Type classes
-        children = defaultdict(list)
-        for k, v in inspect.getmembers(self.__class__, lambda o: isinstance(o, type) and issubclass(o, Type)):
-            if k in done:
-                continue
-            if isinstance(v, type) and issubclass(v, Type):
-                slot_name = getattr(v, "slot_name", "default")
-                children[slot_name].append(v)
-
-        for k, a in ann.items():
-
-            if not (getattr(a, "__metadata__", None) and isinstance(a.__metadata__[0], Slot)):
-                continue
-
-            if typing_utils.issubtype(a.__args__[0], list[Type]):
-                if k in children:
-                    setattr(self, k, sorted([i(parent=self) for i in children[k]], key=lambda o: o._order))
-            elif typing_utils.issubtype(a.__args__[0], Type) and k != "parent":
-                if k in children:
-                    if len(children[k]) > 1:
-                        raise ValueError(f"Expected at most one contained Type class for {self!r} but got {getattr(self, k, None)!r}")
-                    setattr(self, k, children[k][0](parent=self))
+        for k, multiple, children in schema.slots:
+            if not multiple and len(children) > 1:
+                raise ValueError(f"Expected at most one contained Type class for {self!r} but got {getattr(self, k, None)!r}")
+            if self._lazy_slots and not hasattr(self.__class__, k):
+                # instantiated on first access (see __getattr__)
+                self.__dict__.setdefault("_pending_slots", {})[k] = (multiple, children)
+            else:
+                setattr(self, k, self._instantiate_slot(multiple, children))
+
+    def _instantiate_slot(self, multiple: bool, children: tuple[type, ...]) -> "list[Type] or Type":
+        if multiple:
+            return [i(parent=self) for i in children]
+        return children[0](parent=self)
+
+    def __getattr__(self, name):
+        # only called for attributes that are not found otherwise: slots that were not instantiated yet
+        pending = self.__dict__.get("_pending_slots")
+        if pending and name in pending:
+            value = self._instantiate_slot(*pending.pop(name))
+            setattr(self, name, value)
+            return value
+        raise AttributeError(f"{self.__class__.__name__!r} object has no attribute {name!r}")
 
     def compose(self, **kwargs) -> (list[str], str):
         c = composable.Composable()
         already_used = dict()
 
-        p = ModifyingTemplateParser(parent=self)
-        p.feed(self.template)
-        p.close()
-        env = jinja2.Environment(
-            autoescape=False,
-            trim_blocks=True,
-            lstrip_blocks=True,
-            variable_start_string="{&",
-            variable_end_string="&}",
-            extensions=["jinja2.ext.i18n"],
-            undefined=jinja2.StrictUndefined,
-        )
-        compiled = env.compile(
-            self.template, name=f"{self.__class__.__name__}", filename=inspect.getfile(self.__class__) + f"/{self.__class__.__name__}/template"
-        )
-        template = jinja2.Template.from_code(env, compiled, {}, None)
-        context = self.get_template_context(composable=c, already_used=already_used) | kwargs
-        rendered = template.render(context)
-        c.components = c.components.union(p.components)
+        if self.template is self._static_template:
+            compose_stats["static"] += 1
+            rendered = render_static(self.template)
+        else:
+            compose_stats["rendered"] += 1
+            template = templates.get(self.__class__, self.template)
+            context = self.get_template_context(composable=c, already_used=already_used) | kwargs
+            rendered = template.render(context)
+        c.components = c.components.union(scan_components(self.template))
 
         return c, rendered
 
@@ -240,7 +309,23 @@ class Type(metaclass=TypeMetaclass):
         if renderable in already_used:
             return already_used[renderable]
 
-        new_composable, rendered = renderable.compose(**kwargs)
+        cache = active_cache()
+        key = cache.key(renderable, kwargs) if cache else None
+        hit = cache.get(key) if key is not None else None
+        if hit:
+            new_composable, rendered = hit
+        else:
+            hoister = active_hoister()
+            if hoister is None:
+                new_composable, rendered = renderable.compose(**kwargs)
+            else:
+                # literals hoisted while composing are declared by whichever component includes the (maybe cached) output
+                with hoister.collect() as hoisted:
+                    new_composable, rendered = renderable.compose(**kwargs)
+                if hoisted:
+                    new_composable.literals.update(hoisted)
+            if key is not None:
+                cache.put(key, new_composable, rendered)
         if renderable not in composable.included:
             composable.included.add(renderable)
             composable += new_composable
@@ -0,0 +1,235 @@
+"""
+Warm compile daemon
+
+A long running process that keeps the Type registry, the resolvers and the formatter loaded and answers requests on a unix
+socket, so tools that need generated code don't pay for interpreter startup, application import and resolver scans on every
+call.
+
+The protocol is one JSON object per line in each direction. Requests have an "op" key:
+
+- {"op": "compose", "component": "MyView"}: the formatted SFC text for a component (nothing is written)
+- {"op": "generate"}: run generate_code and return its report
+- {"op": "resolve", "tag": "dx-button"}: the canonical name and path a tag resolves to (or null)
+- {"op": "stats"}: per-operation latency statistics
+- {"op": "shutdown"}: stop the daemon
+
+Responses are {"ok": true, "result": ..., "ms": ...} or {"ok": false, "error": "..."}.
+"""
+
+import collections
+import importlib
+import json
+import os
+import socket
+import socketserver
+import time
+from pathlib import Path
+
+from ..core.type import TypeMetaclass
+from ..core.resolve import GeneratedResolver
+from ..generate.generate import generate_code, render_component
+from ..generate.watch import Watcher
+from ..utils.errors import SKDaemonError
+
+__all__ = ["Daemon", "serve", "request"]
+
+
+class LatencyStats:
+    """
+    Latency statistics of one operation (percentiles are computed over the last `window` requests)
+    """
+
+    def __init__(self, window: int = 1000):
+        self.count = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.min_ms = None
+        self.max_ms = None
+        self.recent = collections.deque(maxlen=window)
+
+    def add(self, ms: float, error: bool = False):
+        self.count += 1
+        self.errors += error
+        self.total_ms += ms
+        self.min_ms = ms if self.min_ms is None else min(self.min_ms, ms)
+        self.max_ms = ms if self.max_ms is None else max(self.max_ms, ms)
+        self.recent.append(ms)
+
+    def percentile(self, p: float) -> float or None:
+        if not self.recent:
+            return None
+        ordered = sorted(self.recent)
+        return ordered[min(int(len(ordered) * p), len(ordered) - 1)]
+
+    def as_dict(self) -> dict:
+        return dict(
+            count=self.count,
+            errors=self.errors,
+            mean_ms=self.total_ms / self.count if self.count else None,
+            min_ms=self.min_ms,
+            max_ms=self.max_ms,
+            p50_ms=self.percentile(0.5),
+            p95_ms=self.percentile(0.95),
+            last_ms=self.recent[-1] if self.recent else None,
+        )
+
+
+def _jsonable(o):
+    """Convert a generate_code report (sets and dicts of paths) into something JSON can encode"""
+    if isinstance(o, dict):
+        return {str(k): _jsonable(v) for k, v in o.items()}
+    if isinstance(o, (set, frozenset)):
+        return sorted(str(i) for i in o)
+    if isinstance(o, (list, tuple)):
+        return [_jsonable(i) for i in o]
+    if isinstance(o, Path):
+        return str(o)
+    return o
+
+
+class Daemon:
+    """
+    Request handling for the compile daemon (independent of the transport)
+
+    :param location: default directory for generated files (as for generate_code)
+    :param reload: reload changed registry modules and rescan changed resolver directories before each request
+    :param generate_options: other options passed to generate_code (a formatter given by name is kept open for the lifetime
+                             of the daemon)
+    """
+
+    def __init__(self, location: Path, reload: bool = True, **generate_options):
+        self.location = location
+        self.watcher = Watcher(location, **generate_options)
+        self.generate_options = self.watcher.generate_options
+        self.formatter = self.generate_options["formatter"]
+        self.reload = reload
+        self.stats = collections.defaultdict(LatencyStats)
+        self.running = True
+        self.resolver = GeneratedResolver(location)
+
+    def sync(self):
+        """Pick up code and resolver directory changes"""
+        if self.reload:
+            modules, directories = self.watcher.changes()
+            if modules or directories:
+                self.watcher.sync(modules, directories)
+                self.watcher.snapshot()
+
+    def op_compose(self, component: str) -> dict:
+        cls = TypeMetaclass.by_class_name.get(component) or TypeMetaclass.by_tag.get(component)
+        if cls is None:
+            raise SKDaemonError(f"Unknown component {component!r}")
+        cmp, out = render_component(cls, self.location)
+        return dict(sfc=self.formatter.format(out), components=sorted(cmp.components), imports=list(cmp.imports))
+
+    def op_generate(self) -> dict:
+        return _jsonable(generate_code(self.location, **self.generate_options))
+
+    def op_resolve(self, tag: str) -> dict or None:
+        resolved = TypeMetaclass.resolve([tag])
+        for canonical, path in resolved.items():
+            return dict(canonical=canonical, path=str(path))
+        return None
+
+    def op_stats(self) -> dict:
+        return {op: stats.as_dict() for op, stats in sorted(self.stats.items())}
+
+    def op_shutdown(self) -> None:
+        self.running = False
+
+    def handle(self, request: dict) -> dict:
+        """Handle a single request returning the response"""
+        start = time.perf_counter()
+        op = request.get("op") if isinstance(request, dict) else None
+        handler = getattr(self, f"op_{op}", None) if isinstance(op, str) else None
+        try:
+            if handler is None:
+                raise SKDaemonError(f"Unknown operation {op!r}")
+            if op in ("compose", "generate", "resolve"):
+                self.sync()
+            result = handler(**{k: v for k, v in request.items() if k != "op"})
+            response = dict(ok=True, result=result)
+        except SKDaemonError as e:
+            response = dict(ok=False, error=str(e))
+        except Exception as e:
+            response = dict(ok=False, error=f"{e.__class__.__name__}: {e}")
+        ms = (time.perf_counter() - start) * 1000
+        if handler is not None and op != "stats":
+            self.stats[op].add(ms, error=not response["ok"])
+        response["ms"] = ms
+        return response
+
+    def close(self):
+        self.formatter.close()
+        TypeMetaclass.resolvers.discard(self.resolver)
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+            except ValueError as e:
+                response = dict(ok=False, error=f"Invalid request: {e}")
+            else:
+                response = self.server.daemon.handle(request)
+            self.wfile.write(json.dumps(response).encode() + b"\n")
+            self.wfile.flush()
+            if not self.server.daemon.running:
+                break
+
+
+class _Server(socketserver.UnixStreamServer):
+    # connections are handled one at a time: the registry is not thread safe
+    timeout = 0.5
+
+    def __init__(self, socket_path, daemon):
+        self.daemon = daemon
+        super().__init__(socket_path, _Handler)
+
+
+def serve(socket_path: str or Path, location: Path, modules: list[str] = (), **options):
+    """
+    Run the daemon until it receives a shutdown request or is interrupted
+
+    :param socket_path: path of the unix socket to listen on (a stale socket file is replaced)
+    :param location: default directory for generated files (as for generate_code)
+    :param modules: modules to import before serving (the application modules defining the Types and resolvers)
+    :param options: options for `Daemon`
+    """
+    for module in modules:
+        importlib.import_module(module)
+    socket_path = str(socket_path)
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+
+    daemon = Daemon(location, **options)
+    server = _Server(socket_path, daemon)
+    os.chmod(socket_path, 0o600)
+    try:
+        while daemon.running:
+            server.handle_request()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        daemon.close()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+
+def request(socket_path: str or Path, op: str, **params):
+    """
+    Send a single request to a running daemon
+
+    :return: the result of the request
+    :raises SKDaemonError: if the request failed
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+        s.connect(str(socket_path))
+        s.sendall(json.dumps(dict(op=op, **params)).encode() + b"\n")
+        with s.makefile("rb") as fp:
+            response = json.loads(fp.readline())
+    if not response["ok"]:
+        raise SKDaemonError(response["error"])
+    return response["result"]
@@ -0,0 +1,412 @@
+"""
+Formatters for generated code
+
+All formatters take unformatted text (a SFC or a javascript module) and return the formatted text. They keep timing counters
+in `stats` so the cost of formatting can be reported by `generate_code`. Files that could not be formatted come back as None
+from `try_format_many` (and as an empty string from `format` and `format_many`), they are never cached.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from .pyformat import format_sfc, format_javascript, FORMAT_VERSION
+from ..utils.cache import cache_dir, write_atomic
+
+__all__ = ["Formatter", "NpxFormatter", "WorkerFormatter", "PythonFormatter", "CachingFormatter", "get_formatter", "local_prettier_version"]
+
+
+def local_prettier_version() -> str or None:
+    """Version of the prettier package node resolves from the current directory (None if it is not installed locally)"""
+    cwd = Path.cwd()
+    for directory in [cwd, *cwd.parents]:
+        package = directory / "node_modules" / "prettier" / "package.json"
+        if package.is_file():
+            try:
+                return json.loads(package.read_text()).get("version") or None
+            except (OSError, ValueError):
+                return None
+    return None
+
+
+class Formatter:
+    """
+    Base class for formatters
+    """
+
+    name: str = None
+
+    def __init__(self):
+        self.stats = dict(files=0, batches=0, spawns=0, spawn_seconds=0.0, format_seconds=0.0, fallbacks=0, failures=0)
+
+    def format(self, text: str, filepath: str = "file.vue") -> str:
+        """Format a single file"""
+        return self.format_many([(text, filepath)])[0]
+
+    def format_many(self, items: list[tuple[str, str]]) -> list[str]:
+        """
+        Format a batch of files
+
+        :param items: list of (text, filepath) tuples where filepath is only used to choose a parser
+        :return: list of formatted texts in the same order as items (empty for files that could not be formatted)
+        """
+        return ["" if i is None else i for i in self.try_format_many(items)]
+
+    def try_format_many(self, items: list[tuple[str, str]]) -> list[str or None]:
+        """Like `format_many`, with None for the files that could not be formatted"""
+        if not items:
+            return []
+        start = time.perf_counter()
+        out = self._format_many(items)
+        self.stats["files"] += len(items)
+        self.stats["batches"] += 1
+        self.stats["failures"] += sum(i is None for i in out)
+        self.stats["format_seconds"] += time.perf_counter() - start
+        return out
+
+    def _format_many(self, items: list[tuple[str, str]]) -> list[str or None]:
+        raise NotImplementedError()
+
+    def report(self) -> dict:
+        """Timing counters for reporting"""
+        return dict(self.stats, formatter=self.name)
+
+    @property
+    def cache_key(self) -> str:
+        """Identifies the output of this formatter for `CachingFormatter` (change it when the output for a given input changes)"""
+        return self.name
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __repr__(self):
+        return "<%s %s>" % (self.__class__.__name__, self.stats)
+
+
+class NpxFormatter(Formatter):
+    """
+    Runs `npx prettier` once per file (files in a batch are formatted concurrently)
+    """
+
+    name = "npx"
+
+    def __init__(self, jobs: int = 8):
+        super().__init__()
+        self.jobs = jobs
+        self.version = None
+
+    @property
+    def cache_key(self):
+        if self.version is None:
+            self.version = local_prettier_version()
+        if self.version is None:
+            # not installed locally: only npx knows which prettier it runs
+            process = subprocess.run("npx prettier --version", stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, shell=True)
+            self.version = process.stdout.decode().strip() if process.returncode == 0 else "unknown"
+        return f"{self.name}-{self.version}"
+
+    @staticmethod
+    def _prettier(item):
+        text, filepath = item
+        start = time.perf_counter()
+        command = "npx prettier --stdin-filepath %s" % filepath
+        process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE, shell=True)
+        output, err = process.communicate(input=text.encode())
+        output = output.decode() if process.returncode == 0 else None
+        return output, time.perf_counter() - start
+
+    def _format_many(self, items):
+        if len(items) < 2 or self.jobs < 2:
+            results = [self._prettier(i) for i in items]
+        else:
+            with ThreadPoolExecutor(min(self.jobs, len(items))) as pool:
+                results = list(pool.map(self._prettier, items))
+        self.stats["spawns"] += len(results)
+        self.stats["spawn_seconds"] += sum(seconds for _, seconds in results)
+        return [output for output, _ in results]
+
+
+# language=JavaScript
+WORKER_SCRIPT = r"""
+const path = require("path");
+const readline = require("readline");
+const { createRequire } = require("module");
+
+let prettier;
+try {
+  prettier = createRequire(path.join(process.cwd(), "noop.js"))("prettier");
+} catch (e) {
+  process.stdout.write(JSON.stringify({ ready: false, error: String(e) }) + "\n");
+  process.exit(0);
+}
+process.stdout.write(JSON.stringify({ ready: true, version: prettier.version }) + "\n");
+
+const configs = {};
+async function format({ source, filepath }) {
+  const absolute = path.resolve(filepath);
+  if (!(absolute in configs)) {
+    configs[absolute] = (await prettier.resolveConfig(absolute)) || {};
+  }
+  try {
+    return { output: await prettier.format(source, { ...configs[absolute], filepath: absolute }) };
+  } catch (e) {
+    return { error: String(e) };
+  }
+}
+
+let queue = Promise.resolve();
+readline.createInterface({ input: process.stdin }).on("line", (line) => {
+  const request = JSON.parse(line);
+  queue = queue.then(async () => {
+    const results = [];
+    for (const file of request.files) {
+      results.push(await format(file));
+    }
+    process.stdout.write(JSON.stringify({ id: request.id, results }) + "\n");
+  });
+});
+"""
+
+
+class WorkerFormatter(Formatter):
+    """
+    Formats files through a long-lived node process running prettier
+
+    Requests are batched: each round trip sends up to `batch_size` files as a single line of JSON on stdin and reads the
+    results as a single line of JSON from stdout. If node or a local prettier installation is not available, or the worker
+    dies, files are formatted with `NpxFormatter` instead.
+    """
+
+    name = "worker"
+
+    def __init__(self, batch_size: int = 64):
+        super().__init__()
+        self.batch_size = batch_size
+        self.process = None
+        self.failed = False
+        self.request_id = 0
+        self.version = None  #: prettier version reported by the worker
+        self.fallback = NpxFormatter()
+
+    @property
+    def cache_key(self):
+        # read from the installed package rather than from the worker so cache hits don't start node
+        if self.version is None and not self.failed:
+            self.version = local_prettier_version()
+        if self.version is None or self.failed or not shutil.which("node"):
+            return self.fallback.cache_key
+        return f"{self.name}-{self.version}"
+
+    def start(self) -> bool:
+        """Start the worker process if needed, returns False if the worker is not available"""
+        if self.process and self.process.poll() is None:
+            return True
+        if self.failed or not shutil.which("node"):
+            self.failed = True
+            return False
+
+        start = time.perf_counter()
+        self.process = subprocess.Popen(
+            ["node", "-e", WORKER_SCRIPT],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            encoding="utf-8",
+        )
+        try:
+            ready = json.loads(self.process.stdout.readline() or "{}")
+        except ValueError:
+            ready = dict()
+        self.stats["spawns"] += 1
+        self.stats["spawn_seconds"] += time.perf_counter() - start
+        if not ready.get("ready"):
+            self.close()
+            self.failed = True
+            return False
+        self.version = ready.get("version")
+        return True
+
+    def _round_trip(self, items):
+        self.request_id += 1
+        request = dict(id=self.request_id, files=[dict(source=text, filepath=filepath) for text, filepath in items])
+        try:
+            self.process.stdin.write(json.dumps(request) + "\n")
+            self.process.stdin.flush()
+            response = json.loads(self.process.stdout.readline())
+        except (OSError, ValueError):
+            # the worker died (or answered garbage): don't try to use it again
+            self.close()
+            self.failed = True
+            return None
+        if response.get("id") != self.request_id:
+            self.close()
+            self.failed = True
+            return None
+        return response["results"]
+
+    def _format_many(self, items):
+        out = []
+        for i in range(0, len(items), self.batch_size):
+            batch = items[i : i + self.batch_size]
+            results = self._round_trip(batch) if self.start() else None
+            if results is None:
+                self.stats["fallbacks"] += len(batch)
+                out += self.fallback.try_format_many(batch)
+                continue
+            for item, result in zip(batch, results):
+                if "output" in result:
+                    out.append(result["output"])
+                else:
+                    # let npx have a go so errors behave exactly as they did before
+                    self.stats["fallbacks"] += 1
+                    out += self.fallback.try_format_many([item])
+        return out
+
+    def close(self):
+        if self.process:
+            try:
+                self.process.stdin.close()
+                self.process.wait(timeout=5)
+            except (OSError, subprocess.TimeoutExpired):
+                self.process.kill()
+            self.process = None
+
+    def report(self) -> dict:
+        out = super().report()
+        out["spawns"] += self.fallback.stats["spawns"]
+        out["spawn_seconds"] += self.fallback.stats["spawn_seconds"]
+        return out
+
+
+class PythonFormatter(Formatter):
+    """
+    Formats files in-process with the pure python formatter in `pyformat` (no node required)
+    """
+
+    name = "python"
+
+    @property
+    def cache_key(self):
+        return f"{self.name}-{FORMAT_VERSION}"
+
+    def _format_many(self, items):
+        return [format_javascript(text) + "\n" if filepath.endswith(".js") else format_sfc(text) for text, filepath in items]
+
+
+class CachingFormatter(Formatter):
+    """
+    Content-addressed on-disk cache in front of another formatter
+
+    Results are stored in files named after a hash of the unformatted text (and the formatter, its version and file type) so
+    text that was formatted before is never sent to the formatter again. Failed results are not stored. When the cache grows
+    over `max_bytes` the least recently used entries are evicted (on `close`).
+
+    The cache can not see formatter configuration (e.g. a .prettierrc): call `clear` after changing it.
+    """
+
+    def __init__(self, formatter: Formatter, directory: str or os.PathLike or None = None, max_bytes: int = 64 * 1024 * 1024):
+        super().__init__()
+        self.formatter = formatter
+        self.directory = cache_dir("format") if directory is None else Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.cache_stats = dict(hits=0, misses=0, evictions=0)
+
+    @property
+    def name(self):
+        return self.formatter.name
+
+    @property
+    def cache_key(self):
+        return self.formatter.cache_key
+
+    def _entry(self, text, filepath):
+        h = hashlib.sha256()
+        h.update(self.formatter.cache_key.encode() + b"\0" + os.path.splitext(filepath)[1].encode() + b"\0" + text.encode())
+        key = h.hexdigest()
+        return self.directory / key[:2] / key
+
+    def _format_many(self, items):
+        out = [None] * len(items)
+        missing = []
+        for n, (text, filepath) in enumerate(items):
+            entry = self._entry(text, filepath)
+            try:
+                with entry.open("rt", encoding="utf-8", newline="") as fp:
+                    out[n] = fp.read()
+                os.utime(entry)
+            except OSError:
+                missing.append(n)
+        self.cache_stats["hits"] += len(items) - len(missing)
+        self.cache_stats["misses"] += len(missing)
+
+        if missing:
+            for n, formatted in zip(missing, self.formatter.try_format_many([items[n] for n in missing])):
+                out[n] = formatted
+                if formatted is None:
+                    continue
+                entry = self._entry(*items[n])
+                entry.parent.mkdir(exist_ok=True)
+                write_atomic(entry, formatted.encode("utf-8"))
+        return out
+
+    def evict(self):
+        """Remove the least recently used entries until the cache is no larger than `max_bytes`"""
+        entries = []
+        for sub in self.directory.iterdir():
+            if sub.is_dir():
+                for entry in os.scandir(sub):
+                    st = entry.stat()
+                    entries.append((st.st_mtime_ns, st.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except OSError:
+                continue
+            total -= size
+            self.cache_stats["evictions"] += 1
+
+    def clear(self):
+        """Remove all cached results"""
+        shutil.rmtree(self.directory, ignore_errors=True)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def report(self):
+        out = self.formatter.report()
+        out["format_seconds"] = self.stats["format_seconds"]
+        out["cache"] = dict(self.cache_stats)
+        return out
+
+    def close(self):
+        self.evict()
+        self.formatter.close()
+
+
+FORMATTERS = {
+    "npx": NpxFormatter,
+    "worker": WorkerFormatter,
+    "python": PythonFormatter,
+}
+
+
+def get_formatter(formatter: str or Formatter or None = None) -> Formatter:
+    """Get a formatter by name (or pass through a formatter instance), defaults to a worker formatter"""
+    if isinstance(formatter, Formatter):
+        return formatter
+    if formatter not in FORMATTERS and formatter is not None:
+        raise ValueError(f"Unknown formatter {formatter!r} (expected one of {', '.join(FORMATTERS)})")
+    return FORMATTERS[formatter or "worker"]()
@@ -1,25 +1,184 @@
-import subprocess
+import filecmp
+import importlib
+import multiprocessing
 import os.path
+import secrets
+from contextlib import nullcontext
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
 from ..core.type import Type, generate, TypeMetaclass
 from ..core.resolve import DirectoryResolver, GeneratedResolver
-from ..generate.javascript import js, dumps
+from ..core.compose_cache import ComposeCache, active_cache
+from ..generate.javascript import js, dumps, dump
+from ..generate.literals import LiteralHoister, active_hoister, DATA_FILE_GLOB
 from ..generate import code
+from ..generate.manifest import Manifest, class_key, class_by_key, dependencies_of
+from ..generate.formatter import Formatter, NpxFormatter, CachingFormatter, get_formatter
 
-__all__ = ["generate_code"]
+__all__ = ["generate_code", "render_component", "write_stream_if_changed"]
 
 
-def generate_code(location: Path):
+def write_stream_if_changed(file_name: Path, write) -> str:
+    """
+    Write a file through a temporary file next to it and only replace the file when the content changed
+
+    The content is never held in memory as a whole: it is streamed to the temporary file, which is compared to the existing
+    file chunk by chunk.
+
+    :param write: function called with the open (text mode) temporary file, writing the content
+    :return: "created", "changed" or "unchanged"
+    """
+    tmp = file_name.with_name(f".{file_name.name}.{secrets.token_hex(4)}.tmp")
+    try:
+        with tmp.open("xt") as fp:
+            write(fp)
+        if not file_name.exists():
+            status = "created"
+        elif filecmp.cmp(tmp, file_name, shallow=False):
+            tmp.unlink()
+            return "unchanged"
+        else:
+            status = "changed"
+        os.replace(tmp, file_name)
+        return status
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+
+
+def render_component(cls: type[Type], location: Path):
+    """
+    Compose a class and assemble the (unformatted) SFC text for it
+
+    Literals hoisted by the active `LiteralHoister` are declared in the `<script setup>` (in "import" mode the data files are
+    left to the caller, see `Composable.literals`: they are imported from the directory of the component)
+
+    :return: (composable, sfc text)
+    """
+    cmp = cls()
+
+    hoister = active_hoister()
+    with hoister.collect() if hoister else nullcontext(dict()) as hoisted:
+        cmp, template = cmp.compose()
+        if cmp.props:
+            cmp.setup += code.Const(vars=["props"], value=js.defineProps(cmp.props))
+        setup = cmp.setup._as_javascript() if cmp.setup else ""
+    cmp.literals.update(hoisted)
+    declarations = [(hoister or LiteralHoister()).declaration(name, literal) for name, literal in sorted(cmp.literals.items())]
+    if hoister and hoister.mode == "import":
+        cmp.imports |= dict.fromkeys(declarations)
+        declarations = []
+
+    imports = dict()
+    for canonical, path in TypeMetaclass.resolve(cmp.components).items():
+        rel_path = os.path.relpath(str(path), str(location))
+        if "/" not in rel_path:
+            rel_path = "./" + rel_path
+        imports[f"import {canonical} from '{rel_path}'"] = None
+    cmp.imports |= imports
+
+    out = ""
+    out += """<script setup>\n"""
+    for i in cmp.imports:
+        out += i + ";\n"
+    if cmp.imports:
+        out += "\n"
+    for i in declarations:
+        out += i + ";\n"
+    if declarations:
+        out += "\n"
+    out += setup
+    out += """</script>\n"""
+    out += """<template>\n"""
+    out += template.strip()
+    out += """\n</template>\n"""
+    return cmp, out
+
+
+def _render_job(cls: type[Type] or str, location: Path):
+    """
+    Render a single component (in the current process or in a worker process)
+
+    :return: (unformatted SFC text, dependency class keys, referenced component tags, compose cache counters of the job, hoisted
+             literals)
+    """
+    if isinstance(cls, str):
+        cls = class_by_key(cls)
+    cache = active_cache()
+    before = dict(cache.stats) if cache else None
+    cmp, out = render_component(cls, location)
+    stats = {k: v - before[k] for k, v in cache.stats.items()} if cache else None
+    return out, dependencies_of(cmp), sorted(cmp.components), stats, cmp.literals
+
+
+def _init_worker(modules: list[str], location: Path, compose_cache: bool, hoist_literals: int or None, literal_mode: str):
+    """
+    Process pool initializer: import the modules that define the registry (a no-op for forked workers) and activate the
+    resolver for generated components (a compose cache and a literal hoister) for the lifetime of the worker
+    """
+    for module in modules:
+        importlib.import_module(module)
+    if not any(isinstance(r, GeneratedResolver) and r.directory == location for r in TypeMetaclass.resolvers):
+        GeneratedResolver(location)
+    if compose_cache:
+        ComposeCache().__enter__()
+    if hoist_literals is not None:
+        LiteralHoister(hoist_literals, literal_mode).__enter__()
+
+
+def _registry_modules() -> list[str]:
+    """Names of all importable modules that define Type subclasses"""
+    return sorted({c.__module__ for c in TypeMetaclass.by_class_name.values()} - {"__main__", "__mp_main__"})
+
+
+def generate_code(
+    location: Path,
+    incremental: bool = False,
+    workers: int or None = None,
+    formatter: str or Formatter or None = None,
+    format_cache: bool or Path = False,
+    compose_cache: bool or ComposeCache = False,
+    hoist_literals: int or None = None,
+    literal_mode: str = "parse",
+):
+    """
+    Generate a SFC file for every class marked with @generate and a routes.js file for all routes
+
+    :param location: default directory for generated files
+    :param incremental: skip components whose inputs did not change since the last run (tracked in a manifest file in `location`)
+    :param workers: number of worker processes used to compose components (None or 1 to generate serially); the calling
+                    process still formats and writes all files, generates routes.js and removes stale files
+    :param formatter: formatter name ("worker" (default), "npx" or "python") or a Formatter instance (which is left open so it can be
+                      reused across runs)
+    :param format_cache: cache formatted output on disk keyed by the unformatted text (True for the default cache directory
+                         or the path of a cache directory)
+    :param compose_cache: reuse the output of components used with the same state in several views (True for a cache scoped
+                          to this run or a ComposeCache instance, which is kept across runs until it is invalidated); worker
+                          processes each use their own cache
+    :param hoist_literals: move lists and dicts passed to `dumps` whose JSON is at least this many characters long out of the
+                           components (None to keep all literals inline)
+    :param literal_mode: how hoisted literals are declared: "parse" (JSON.parse in the component) or "import" (a JSON file
+                         next to the component, imported by it)
+    :return: a report dict of sets of created, changed, deleted and unchanged files, formatter timing counters (and cache
+             statistics), compose cache statistics (when enabled), the size of each literal hoisted out of each file (when
+             enabled) and (when incremental) dicts of skipped and rebuilt files with the reason for each
+    """
 
     all_files = set()
     created = set()
     changed = set()
     deleted = set()
     unchanged = set()
+    skipped = dict()
+    rebuilt = dict()
 
-    def write_if_changed(file_name: Path, content: str):
+    def write_if_changed(file_name: Path, content: str or callable):
+        """Write a file unless it already has this content (a callable content is streamed with write_stream_if_changed)"""
         all_files.add(file_name)
+        if callable(content):
+            status = write_stream_if_changed(file_name, content)
+            return dict(created=created, changed=changed, unchanged=unchanged)[status].add(file_name)
         if file_name.exists():
             with file_name.open("rt") as fp:
                 if fp.read() == content:
@@ -32,48 +191,78 @@ def generate_code(location: Path):
         with file_name.open("wt") as fp:
             fp.write(content)
 
-    with GeneratedResolver(location):
+    location.mkdir(parents=True, exist_ok=True)
+    own_formatter = not isinstance(formatter, Formatter)
+    formatter = get_formatter(formatter)
+    if format_cache:
+        formatter = CachingFormatter(formatter, directory=None if format_cache is True else format_cache)
+    options = dict(location=str(location), formatter=formatter.name)
+    if hoist_literals is not None:
+        options |= dict(hoist_literals=hoist_literals, literal_mode=literal_mode)
+    manifest = Manifest(location, options=options) if incremental else None
+    hoister = LiteralHoister(hoist_literals, literal_mode) if hoist_literals is not None else None
+    literals = dict()
+
+    with GeneratedResolver(location), formatter if own_formatter else nullcontext():
 
         routes = []
 
         routes_file = location / "routes.js"
 
+        jobs = []
+        target_locations = {location}
         for cls, target_location in TypeMetaclass.to_generate.items():
 
             target_location = target_location or location
             target_location.mkdir(parents=True, exist_ok=True)
-
-            cmp = cls()
-
-            cmp, template = cmp.compose()
-
-            imports = dict()
-            for canonical, path in TypeMetaclass.resolve(cmp.components).items():
-                rel_path = os.path.relpath(str(path), str(location))
-                if "/" not in rel_path:
-                    rel_path = "./" + rel_path
-                imports[f"import {canonical} from '{rel_path}'"] = None
-            cmp.imports |= imports
-
-            out = ""
-            out += """<script setup>\n"""
-            for i in cmp.imports:
-                out += i + ";\n"
-            if cmp.imports:
-                out += "\n"
-            if cmp.props:
-                cmp.setup += code.Const(vars=["props"], value=js.defineProps(cmp.props))
-            out += cmp.setup._as_javascript() if cmp.setup else ""
-            out += """</script>\n"""
-            out += """<template>\n"""
-            out += template.strip()
-            out += """\n</template>\n"""
-
-            pretty_out = prettify(out)
+            target_locations.add(target_location)
 
             out_file = target_location.joinpath(cls.class_name + ".vue")
+
+            reason = manifest.check(cls, out_file) if manifest else None
+            if manifest and not reason:
+                all_files.add(out_file)
+                all_files.update(manifest.data_files(out_file))
+                skipped[out_file] = "inputs unchanged since last run"
+                manifest.keep(out_file)
+            else:
+                jobs.append((cls, out_file, reason))
+
+        if workers and workers > 1 and len(jobs) > 1:
+            context = multiprocessing.get_context("fork" if "fork" in multiprocessing.get_all_start_methods() else "spawn")
+            initargs = (_registry_modules(), location, bool(compose_cache), hoist_literals, literal_mode)
+            pool = ProcessPoolExecutor(workers, mp_context=context, initializer=_init_worker, initargs=initargs)
+            results = pool.map(_render_job, [class_key(cls) for cls, _, _ in jobs], [location] * len(jobs))
+            cache = None
+        else:
+            pool = None
+            results = map(_render_job, [cls for cls, _, _ in jobs], [location] * len(jobs))
+            cache = compose_cache if isinstance(compose_cache, ComposeCache) else ComposeCache() if compose_cache else None
+
+        try:
+            with cache if cache else nullcontext(), hoister if hoister and not pool else nullcontext():
+                results = list(results)
+        finally:
+            if pool:
+                pool.shutdown()
+
+        pretty_outs = formatter.format_many([(out, "file.vue") for out, *_ in results])
+        for (cls, out_file, reason), (_, dependencies, components, _, hoisted), pretty_out in zip(jobs, results, pretty_outs):
             write_if_changed(out_file, pretty_out)
+            data_files = []
+            if literal_mode == "import":
+                for name, literal in hoisted.items():
+                    data_file = out_file.parent / f"{name}.json"  # imported as './{name}.json' by the component
+                    if data_file not in all_files:
+                        write_if_changed(data_file, lambda fp, value=literal.value: dump(value, fp))
+                    data_files.append(data_file)
+            if hoisted:
+                literals[out_file] = {name: literal.size for name, literal in hoisted.items()}
+            if manifest:
+                rebuilt[out_file] = reason
+                manifest.record(cls, out_file, dependencies, components, data_files)
 
+        for cls in TypeMetaclass.to_generate:
             if getattr(cls, "_route", None):
                 desc = dict(**cls._route)
                 resolved = TypeMetaclass.resolve({cls.class_name})
@@ -85,20 +274,34 @@ def generate_code(location: Path):
                 desc["component"] = js(f"() => import('{new_path}.vue')")
                 routes.append(desc)
 
-        pretty_out = prettify(f"export default {dumps(routes)}")
+        pretty_out = formatter.format(f"export default {dumps(routes)}")
         write_if_changed(routes_file, pretty_out)
 
-        for file in location.glob("**/*.vue"):
+        existing_data_files = {*location.glob("**/" + DATA_FILE_GLOB), *(f for d in target_locations for f in d.glob(DATA_FILE_GLOB))}
+        for file in [*location.glob("**/*.vue"), *sorted(existing_data_files)]:
             if file not in all_files:
                 deleted.add(file)
                 file.unlink()
 
-        return dict(created=created, changed=changed, deleted=deleted, unchanged=unchanged)
+        if format_cache and not own_formatter:
+            formatter.evict()
+
+        rc = dict(created=created, changed=changed, deleted=deleted, unchanged=unchanged, formatter=formatter.report())
+        if compose_cache:
+            stats = dict(hits=0, misses=0, uncacheable=0)
+            for _, _, _, job_stats, _ in results:
+                for k, v in (job_stats or {}).items():
+                    stats[k] += v
+            lookups = stats["hits"] + stats["misses"]
+            rc["compose_cache"] = dict(stats, hit_rate=stats["hits"] / lookups if lookups else None)
+        if hoister:
+            rc["literals"] = literals
+        if manifest:
+            manifest.save()
+            rc |= dict(skipped=skipped, rebuilt=rebuilt)
+
+        return rc
 
 
 def prettify(vue_code):
-    command = "npx prettier --stdin-filepath file.vue"
-    process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE, shell=True)
-    output, err = process.communicate(input=vue_code.encode())
-    output = output.decode()
-    return output
+    return NpxFormatter().format(vue_code)
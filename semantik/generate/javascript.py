@@ -1,6 +1,7 @@
 import datetime
 import json
 from ..utils import encoder
+from .literals import active_hoister
 
 __all__ = ["js", "format_object", "string_or_js"]
 
@@ -11,10 +12,26 @@ _encoder = None
 def dumps(o):
     global _encoder
     if not _encoder:
-        _encoder = encoder.JSONEncoder()
+        _encoder = encoder.JSONEncoder(hybrid=True)
     if hasattr(o, "_as_javascript"):
         return o._as_javascript()  # test here for performance
-    return _encoder.encode(o)
+    text = _encoder.encode(o)
+    hoister = active_hoister()
+    if hoister is not None and len(text) >= hoister.threshold and isinstance(o, (dict, list, tuple)):
+        return hoister.hoist(text, o)
+    return text
+
+
+def dump(o, fp, chunk_size=encoder.CHUNK_SIZE):
+    """Write dumps(o) to a file-like object in chunks of about chunk_size characters (without building the whole string)"""
+    global _encoder
+    if not _encoder:
+        _encoder = encoder.JSONEncoder(hybrid=True)
+    if hasattr(o, "_as_javascript"):
+        text = o._as_javascript()
+        fp.write(text)
+        return len(text)
+    return _encoder.dump(o, fp, chunk_size=chunk_size)
 
 
 def indent_string(s, i="  "):
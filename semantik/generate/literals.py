@@ -0,0 +1,119 @@
+"""
+Hoisting of large literals out of generated components
+
+While a `LiteralHoister` is active, `dumps` replaces lists and dicts whose encoding is at least `threshold` characters long and
+is plain JSON (no dates, javascript expressions, NaN, ...) by the name of a constant. The browser parses JSON much faster than
+the same data written as a javascript expression, so the data is declared either as
+
+- ``const skLiteral_<hash> = JSON.parse('...')`` in the `<script setup>` of the component ("parse" mode, the data is parsed
+  again for every component instance, like the literal it replaces) or as
+- ``import skLiteral_<hash> from './skLiteral_<hash>.json'`` of a JSON file written next to the generated components
+  ("import" mode, the data is part of a separate module shared by all instances, so it should not be modified)
+
+Literals are named after a hash of their JSON text so the same data used in several places is declared once (and is a single
+object in the component). Literals are only hoisted while composing a component (inside `collect`), the names hoisted while
+composing are recorded in the `literals` of the composable.
+
+In "import" mode the hoister keeps the literal itself rather than its text, the data file is written from it with
+`javascript.dump` (streamed, without building the whole text again).
+"""
+
+import contextlib
+import hashlib
+import json
+from typing import NamedTuple, Any
+
+__all__ = ["LiteralHoister", "Literal", "active_hoister", "NAME_PREFIX", "DATA_FILE_GLOB"]
+
+NAME_PREFIX = "skLiteral_"
+DATA_FILE_GLOB = NAME_PREFIX + "*.json"  #: data files written in "import" mode
+MODES = ("parse", "import")
+
+_active = []  #: stack of active hoisters
+
+
+def active_hoister() -> "LiteralHoister or None":
+    """The innermost active literal hoister (or None)"""
+    return _active[-1] if _active else None
+
+
+class Literal(NamedTuple):
+    """A hoisted literal"""
+
+    size: int  #: length of the JSON text
+    text: str or None  #: JSON text ("parse" mode)
+    value: Any = None  #: the literal itself ("import" mode, written to the data file with `javascript.dump`)
+
+
+def _reject_constant(name):
+    raise ValueError(f"{name} is not JSON")
+
+
+class LiteralHoister:
+    """
+    Replaces large JSON literals by named constants
+
+    Use as a context manager to make it the active hoister for `dumps`.
+
+    :param threshold: minimum length (in characters) of the encoded literal
+    :param mode: "parse" (JSON.parse in the component) or "import" (separate JSON file)
+    """
+
+    def __init__(self, threshold: int = 16 * 1024, mode: str = "parse"):
+        if mode not in MODES:
+            raise ValueError(f"Unknown literal mode {mode!r}, use one of {', '.join(MODES)}")
+        self.threshold = threshold
+        self.mode = mode
+        self.frames = []  #: name => `Literal` for the literals hoisted in each (nested) collect block
+        self.names = dict()  #: hash of a literal => its name (or None when it is not JSON)
+
+    @contextlib.contextmanager
+    def collect(self):
+        """Context manager collecting the literals hoisted in the block (yields a dict of name => `Literal`)"""
+        frame = dict()
+        self.frames.append(frame)
+        try:
+            yield frame
+        finally:
+            del self.frames[next(n for n, f in enumerate(self.frames) if f is frame)]
+
+    def hoist(self, text: str, value: Any = None) -> str:
+        """
+        Hoist an encoded literal
+
+        :param text: JSON text of the literal
+        :param value: the literal itself (kept in "import" mode)
+        :return: the name of the literal or the text itself if it is not hoisted
+        """
+        if not self.frames:
+            return text
+        digest = hashlib.sha256(text.encode()).hexdigest()
+        name = self.names.get(digest, False)
+        if name is False:
+            try:
+                json.loads(text, parse_constant=_reject_constant)
+                name = NAME_PREFIX + digest[:16]
+            except ValueError:
+                name = None
+            self.names[digest] = name
+        if name is None:
+            return text
+        if self.mode == "import":
+            self.frames[-1][name] = Literal(len(text), None, value)
+        else:
+            self.frames[-1][name] = Literal(len(text), text)
+        return name
+
+    def declaration(self, name: str, literal: Literal) -> str:
+        """The `<script setup>` line declaring a literal"""
+        if self.mode == "import":
+            return f"import {name} from './{name}.json'"
+        escaped = literal.text.replace("\\", "\\\\").replace("'", "\\'").replace("</", "<\\/")
+        return f"const {name} = JSON.parse('{escaped}')"
+
+    def __enter__(self):
+        _active.append(self)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        _active.remove(self)
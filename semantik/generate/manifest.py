@@ -0,0 +1,192 @@
+"""
+Dependency manifest for incremental code generation
+
+The manifest records, for every generated .vue file, a fingerprint of everything the file depends on so that a later run of
+`generate_code` can skip components whose inputs have not changed.
+"""
+
+import ast
+import hashlib
+import inspect
+import json
+import sys
+from pathlib import Path
+
+from ..core.type import TypeMetaclass
+
+__all__ = ["Manifest", "class_key", "class_by_key", "dependencies_of"]
+
+MANIFEST_NAME = ".semantik-manifest.json"
+MANIFEST_VERSION = 1
+
+
+def class_key(cls) -> str:
+    """Stable identifier for a class that survives across processes"""
+    return f"{cls.__module__}:{cls.__qualname__}"
+
+
+def class_by_key(key: str):
+    """Find a class from a key returned by `class_key` (returns None if it no longer exists)"""
+    module_name, _, qualname = key.partition(":")
+    ob = sys.modules.get(module_name)
+    for part in qualname.split("."):
+        ob = getattr(ob, part, None)
+        if ob is None:
+            return None
+    return ob if isinstance(ob, type) else None
+
+
+def dependencies_of(composable) -> list[str]:
+    """Keys of the classes of all renderables pulled in through `use` while composing"""
+    return sorted({class_key(i if isinstance(i, type) else i.__class__) for i in composable.included})
+
+
+class _SourceIndex:
+    """
+    Per-run cache of class sources (each module is parsed at most once)
+    """
+
+    def __init__(self):
+        self.modules = dict()
+
+    def _module_index(self, module_name):
+        if module_name in self.modules:
+            return self.modules[module_name]
+
+        index = dict()
+        module = sys.modules.get(module_name)
+        try:
+            file_name = inspect.getsourcefile(module)
+            with open(file_name, "rt") as fp:
+                lines = fp.read().split("\n")
+            tree = ast.parse("\n".join(lines))
+        except (TypeError, OSError, SyntaxError):
+            self.modules[module_name] = index
+            return index
+
+        def walk(node, prefix):
+            for child in ast.iter_child_nodes(node):
+                if isinstance(child, ast.ClassDef):
+                    qualname = prefix + child.name
+                    start = min([child.lineno] + [d.lineno for d in child.decorator_list])
+                    index[qualname] = "\n".join(lines[start - 1 : child.end_lineno])
+                    walk(child, qualname + ".")
+                elif isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                    walk(child, prefix + child.name + ".<locals>.")
+                else:
+                    walk(child, prefix)
+
+        walk(tree, "")
+        self.modules[module_name] = index
+        return index
+
+    def source(self, cls) -> str:
+        src = self._module_index(cls.__module__).get(cls.__qualname__)
+        if src is None:
+            # no source available (dynamically created class): fall back to the class namespace
+            src = repr(sorted(k for k in cls.__dict__ if not k.startswith("__")))
+        return src + "\n" + repr(getattr(cls, "template", None))
+
+    def class_hash(self, cls) -> str:
+        """Hash of a class, its template and all its (non-builtin) parent classes"""
+        h = hashlib.sha256()
+        for c in cls.__mro__:
+            if c.__module__ == "builtins":
+                continue
+            h.update(class_key(c).encode())
+            h.update(self.source(c).encode())
+        return h.hexdigest()
+
+
+def _hash(*parts) -> str:
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class Manifest:
+    """
+    Persisted record of the inputs that went into each generated file
+    """
+
+    def __init__(self, location: Path, options: dict = None):
+        self.file_name = location / MANIFEST_NAME
+        self.options = _hash(options or {})
+        self.entries = dict()
+        self.sources = _SourceIndex()
+        if self.file_name.exists():
+            try:
+                with self.file_name.open("rt") as fp:
+                    data = json.load(fp)
+                if data.get("version") == MANIFEST_VERSION:
+                    self.entries = data.get("entries", {})
+            except (OSError, ValueError):
+                self.entries = dict()
+        self.new_entries = dict()
+
+    @staticmethod
+    def _file_state(file_name: Path):
+        try:
+            st = file_name.stat()
+        except OSError:
+            return None
+        return [st.st_size, st.st_mtime_ns]
+
+    def _fingerprint(self, cls, dependencies: list[str], components: list[str]) -> dict or None:
+        dep_classes = [class_by_key(i) for i in dependencies]
+        if any(i is None for i in dep_classes):
+            return None
+        resolved = {k: str(v) for k, v in TypeMetaclass.resolve(components).items()}
+        return dict(
+            source=self.sources.class_hash(cls),
+            dependencies=_hash([self.sources.class_hash(i) for i in dep_classes]),
+            imports=_hash(resolved),
+            options=self.options,
+        )
+
+    def check(self, cls, out_file: Path) -> str or None:
+        """
+        Check whether `out_file` generated from `cls` is up-to-date
+
+        :return: None if the component needs no regeneration, otherwise the reason it needs to be regenerated
+        """
+        entry = self.entries.get(str(out_file))
+        if not entry or entry.get("class") != class_key(cls):
+            return "not in manifest"
+        if entry.get("file") != self._file_state(out_file):
+            return "output file modified or missing"
+        if any(self._file_state(Path(i)) != state for i, state in entry.get("data", {}).items()):
+            return "data file modified or missing"
+        fingerprint = self._fingerprint(cls, entry["dependencies"], entry["components"])
+        if fingerprint is None:
+            return "dependency no longer exists"
+        for part, reason in (
+            ("options", "generation options changed"),
+            ("source", "class source changed"),
+            ("dependencies", "dependency source changed"),
+            ("imports", "resolved imports changed"),
+        ):
+            if entry["fingerprint"].get(part) != fingerprint[part]:
+                return reason
+        return None
+
+    def data_files(self, out_file: Path) -> list[Path]:
+        """The data files (hoisted literals) recorded for a component"""
+        return [Path(i) for i in self.entries.get(str(out_file), {}).get("data", {})]
+
+    def keep(self, out_file: Path):
+        """Carry over the entry for a component that was skipped"""
+        self.new_entries[str(out_file)] = self.entries[str(out_file)]
+
+    def record(self, cls, out_file: Path, dependencies: list[str], components: list[str], data_files: list[Path] = ()):
+        """Record the inputs of a component that was just generated (and the data files it imports)"""
+        self.new_entries[str(out_file)] = dict(
+            **{"class": class_key(cls)},
+            dependencies=dependencies,
+            components=components,
+            fingerprint=self._fingerprint(cls, dependencies, components),
+            file=self._file_state(out_file),
+            data={str(i): self._file_state(i) for i in data_files},
+        )
+
+    def save(self):
+        with self.file_name.open("wt") as fp:
+            json.dump(dict(version=MANIFEST_VERSION, entries=self.new_entries), fp, indent=1, sort_keys=True)
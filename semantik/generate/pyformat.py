@@ -0,0 +1,394 @@
+"""
+Pure python formatter for generated single file components and javascript modules
+
+This is not a general purpose code formatter: it only re-indents the code that `generate_code` assembles so the output is
+stable and diff-friendly without needing node. It never reflows code or moves tokens, it only changes whitespace where the
+vue template compiler (with its default "condense" whitespace handling) and javascript ignore it:
+
+- javascript is re-indented by bracket depth (strings, template literals, regular expression literals and comments are left
+  alone)
+- templates are re-indented by element depth, line breaks are kept where the source had whitespace containing a newline and
+  elements that hug their neighbours or their content keep doing so
+"""
+
+import re
+
+__all__ = ["format_sfc", "format_template", "format_javascript"]
+
+FORMAT_VERSION = 2  #: bump when the output of the formatter changes (invalidates cached results)
+INDENT = "  "
+
+VOID_ELEMENTS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "param", "source", "track", "wbr"}
+RAW_TEXT_ELEMENTS = {"script", "style", "pre", "textarea"}
+
+PAT_BLOCK_START = re.compile(r"<(script|template|style)(\s[^>]*)?>", re.IGNORECASE)
+PAT_TAG_NAME = re.compile(r"</?([A-Za-z][^\s/>]*)")
+PAT_MUSTACHE = re.compile(r"(\{\{.*?}})", re.DOTALL)
+PAT_NEWLINE_SPACE = re.compile(r"\s*\n\s*")
+PAT_SPACE = re.compile(r"\s+")
+
+# a / after one of these keywords starts a regular expression literal (after other words it is a division)
+REGEX_KEYWORDS = {"return", "typeof", "instanceof", "in", "of", "new", "delete", "void", "throw", "case", "do", "else", "yield", "await"}
+
+
+#
+# javascript
+#
+
+
+def _is_word_char(ch):
+    return ch.isalnum() or ch in "_$"
+
+
+def _regex_allowed(previous: str) -> bool:
+    """Whether a / after the previous token (a word or a punctuation character) starts a regular expression literal"""
+    if not previous:
+        return True
+    if _is_word_char(previous[-1]):
+        return previous in REGEX_KEYWORDS
+    return previous not in ")]'\"`"
+
+
+def _skip_regex(text: str, i: int) -> int:
+    """Index of the / closing the regular expression literal starting at i (or the end of the line)"""
+    in_class = False
+    i += 1
+    while i < len(text):
+        ch = text[i]
+        if ch == "\\":
+            i += 1
+        elif in_class:
+            in_class = ch != "]"
+        elif ch == "[":
+            in_class = True
+        elif ch == "/":
+            return i
+        i += 1
+    return len(text)
+
+
+def format_javascript(text: str, depth: int = 0) -> str:
+    """
+    Re-indent javascript code by bracket depth
+
+    :param text: javascript code
+    :param depth: indentation level of the outermost code
+    :return: the re-indented code (without leading or trailing blank lines)
+    """
+    out = []
+    stack = []  #: "`" inside a template literal, "${" inside a template literal expression, "(" inside brackets in an expression
+    level = 0
+    in_comment = False
+    previous = ""  #: last token of the code outside strings and comments (a word or a punctuation character)
+
+    for line in text.split("\n"):
+        verbatim = in_comment or bool(stack and stack[-1] == "`")
+        stripped = line.strip()
+        level_before = level
+        leading_closers = 0
+        leading = not verbatim
+
+        i = 0
+        quote = None
+        while i < len(stripped):
+            ch = stripped[i]
+            if leading and ch not in ")]} \t":
+                leading = False
+            if in_comment:
+                if stripped.startswith("*/", i):
+                    in_comment = False
+                    i += 1
+            elif quote:
+                if ch == "\\":
+                    i += 1
+                elif ch == quote:
+                    quote = None
+                    previous = ch
+            elif stack and stack[-1] == "`":
+                if ch == "\\":
+                    i += 1
+                elif ch == "`":
+                    stack.pop()
+                    previous = ch
+                elif stripped.startswith("${", i):
+                    stack.append("${")
+                    previous = "{"
+                    i += 1
+            elif stripped.startswith("//", i):
+                break
+            elif stripped.startswith("/*", i):
+                in_comment = True
+                i += 1
+            elif ch == "/" and _regex_allowed(previous):
+                i = _skip_regex(stripped, i)
+                previous = ")"  # the literal is an operand: a / after it is a division
+            elif ch in "'\"":
+                quote = ch
+            elif ch == "`":
+                stack.append("`")
+            else:
+                if ch in "([{":
+                    if stack:
+                        stack.append("(")
+                    else:
+                        level += 1
+                elif ch in ")]}":
+                    if stack:
+                        stack.pop()
+                    else:
+                        level = max(level - 1, 0)
+                        if leading:
+                            leading_closers += 1
+                if not ch.isspace():
+                    previous = previous + ch if _is_word_char(ch) and i and _is_word_char(stripped[i - 1]) else ch
+            i += 1
+
+        if verbatim:
+            out.append(line)
+        elif not stripped:
+            if out and out[-1]:
+                out.append("")
+        else:
+            if stack and stack[-1] == "`":
+                # the line ends inside a template literal so its trailing whitespace is part of the string
+                stripped = line.lstrip()
+            out.append(INDENT * (max(level_before - leading_closers, 0) + depth) + stripped)
+
+    while out and not out[-1]:
+        out.pop()
+    return "\n".join(out)
+
+
+#
+# templates
+#
+
+
+class _Element:
+    def __init__(self, name, start, void):
+        self.name = name
+        self.start = start
+        self.void = void
+        self.children = []
+        self.end = ""
+
+
+class _Atom:
+    def __init__(self, raw):
+        self.raw = raw
+
+
+def _find_tag_end(text, i):
+    """Index just after the > closing the tag starting at i (quoted attribute values may contain >)"""
+    quote = None
+    for j in range(i + 1, len(text)):
+        ch = text[j]
+        if quote:
+            if ch == quote:
+                quote = None
+        elif ch in "'\"":
+            quote = ch
+        elif ch == ">":
+            return j + 1
+    return len(text)
+
+
+def _parse_template(text):
+    root = _Element(None, "", False)
+    stack = [root]
+    i = 0
+    text_start = 0
+
+    def flush_text(end):
+        if end > text_start:
+            stack[-1].children.append(text[text_start:end])
+
+    while i < len(text):
+        if text.startswith("{{", i):
+            end = text.find("}}", i + 2)
+            i = len(text) if end < 0 else end + 2
+            continue
+        if text[i] != "<":
+            i += 1
+            continue
+        if text.startswith("<!--", i):
+            flush_text(i)
+            end = text.find("-->", i + 4)
+            end = len(text) if end < 0 else end + 3
+            stack[-1].children.append(_Atom(text[i:end]))
+            i = text_start = end
+            continue
+        m = PAT_TAG_NAME.match(text, i)
+        if not m:
+            i += 1
+            continue
+
+        flush_text(i)
+        end = _find_tag_end(text, i)
+        raw = text[i:end]
+        name = m.group(1).lower()
+        if raw.startswith("</"):
+            if any(e.name == name for e in stack[1:]):
+                while stack[-1].name != name:
+                    stack.pop()
+                stack.pop().end = raw
+            else:
+                stack[-1].children.append(_Atom(raw))
+        elif name in RAW_TEXT_ELEMENTS and not raw.endswith("/>"):
+            close = re.compile(r"</%s\s*>" % re.escape(name), re.IGNORECASE).search(text, end)
+            end = len(text) if not close else close.end()
+            stack[-1].children.append(_Atom(text[i:end]))
+        else:
+            element = _Element(name, raw, name in VOID_ELEMENTS or raw.endswith("/>"))
+            stack[-1].children.append(element)
+            if not element.void:
+                stack.append(element)
+        i = text_start = end
+
+    flush_text(len(text))
+    return root
+
+
+BREAK = object()
+
+
+def _tokens(children):
+    """Flatten children into inline tokens (strings and nodes) and BREAKs where the source had whitespace with a newline"""
+    out = []
+    for child in children:
+        if not isinstance(child, str):
+            out.append(child)
+            continue
+        for n, piece in enumerate(PAT_MUSTACHE.split(child)):
+            if n % 2:
+                out.append(piece)
+                continue
+            for m, part in enumerate(PAT_NEWLINE_SPACE.split(piece)):
+                if m:
+                    out.append(BREAK)
+                if part:
+                    out.append(PAT_SPACE.sub(" ", part))
+    return out
+
+
+def _groups(tokens):
+    groups = [[]]
+    for token in tokens:
+        if token is BREAK:
+            if groups[-1]:
+                groups.append([])
+        else:
+            groups[-1].append(token)
+    return [g for g in groups if g]
+
+
+def _render_group(group, depth):
+    lines = [""]
+    for token in group:
+        if isinstance(token, str):
+            lines[-1] += token
+        else:
+            node_lines = _render_node(token, depth)
+            lines[-1] += node_lines[0]
+            lines += node_lines[1:]
+    return lines
+
+
+def _render_children(start, children, end, depth, force_breaks=False):
+    tokens = _tokens(children)
+    if BREAK not in tokens and not force_breaks:
+        lines = _render_group(tokens, depth)
+        lines[0] = start + lines[0]
+        lines[-1] += end
+        return lines
+
+    leading = force_breaks or (tokens and tokens[0] is BREAK)
+    trailing = force_breaks or (tokens and tokens[-1] is BREAK)
+    lines = [start]
+    for n, group in enumerate(_groups(tokens)):
+        group_lines = _render_group(group, depth + 1)
+        if n == 0 and not leading:
+            lines[-1] += group_lines[0]
+        else:
+            lines.append(INDENT * (depth + 1) + group_lines[0])
+        lines += group_lines[1:]
+    if trailing:
+        lines.append(INDENT * depth + end)
+    else:
+        lines[-1] += end
+    return lines
+
+
+def _render_node(node, depth):
+    if isinstance(node, _Atom):
+        return [node.raw]
+    if node.void:
+        return [node.start]
+    return _render_children(node.start, node.children, node.end, depth)
+
+
+def format_template(text: str, depth: int = 0) -> str:
+    """
+    Re-indent the contents of a template block
+
+    :param text: html/vue template code
+    :param depth: indentation level of the outermost elements
+    :return: the re-indented template (without leading or trailing whitespace)
+    """
+    root = _parse_template(text.strip())
+    lines = _render_children("", root.children, "", depth - 1, force_breaks=True)
+    return "\n".join(lines[1:-1])
+
+
+#
+# single file components
+#
+
+
+def _find_block_end(text, name, start):
+    """Returns (content end, block end) of the top level block `name` whose content starts at start"""
+    if name == "template":
+        nesting = 1
+        for m in re.finditer(r"<(/?)template\b[^>]*>", text[start:], re.IGNORECASE):
+            if m.group(0).endswith("/>") and not m.group(1):
+                continue
+            nesting += -1 if m.group(1) else 1
+            if not nesting:
+                return start + m.start(), start + m.end()
+    else:
+        m = re.compile(r"</%s\s*>" % name, re.IGNORECASE).search(text, start)
+        if m:
+            return m.start(), m.end()
+    return len(text), len(text)
+
+
+def format_sfc(text: str) -> str:
+    """
+    Format a single file component (text that does not start with a top-level block is formatted as javascript)
+
+    :param text: vue SFC code
+    :return: formatted code ending with a newline
+    """
+    blocks = []
+    i = 0
+    while True:
+        m = PAT_BLOCK_START.search(text, i)
+        if not m or text[i : m.start()].strip():
+            break
+        name = m.group(1).lower()
+        content_end, end = _find_block_end(text, name, m.end())
+        content = text[m.end() : content_end]
+        if name == "script":
+            content = format_javascript(content)
+        elif name == "template":
+            content = format_template(content, depth=1)
+        else:
+            content = content.strip("\n")
+        blocks.append(m.group(0) + "\n" + (content + "\n" if content else "") + text[content_end:end])
+        i = end
+
+    if not blocks:
+        return format_javascript(text) + "\n"
+    if text[i:].strip():
+        blocks.append(text[i:].strip())
+    return "\n\n".join(blocks) + "\n"
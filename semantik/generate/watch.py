@@ -0,0 +1,208 @@
+"""
+Watch mode: regenerate components when the python code defining them (or a resolver directory) changes
+"""
+
+import importlib
+import os
+import sys
+import time
+import types
+import warnings
+from pathlib import Path
+
+from ..core.type import TypeMetaclass
+from ..core.resolve import DirectoryResolver, GeneratedResolver
+from ..generate.generate import generate_code
+from ..generate.formatter import get_formatter
+from ..generate.manifest import class_key
+
+__all__ = ["Watcher", "watch"]
+
+
+class Watcher:
+    """
+    Polls the modules that define Type subclasses and the directories of DirectoryResolvers for changes
+
+    On change, the changed modules (and the registry modules that import from them) are reloaded in place with
+    `TypeMetaclass.in_reload` set, resolvers of changed directories are rescanned and `generate_code` is run in incremental mode
+    so only impacted components are regenerated. Changes that arrive within `debounce` seconds of each other are handled as a
+    single rebuild.
+    """
+
+    def __init__(self, location: Path, debounce: float = 0.3, interval: float = 0.5, **generate_options):
+        self.location = location
+        self.debounce = debounce
+        self.interval = interval
+        self.generate_options = generate_options
+        self.generate_options["formatter"] = get_formatter(generate_options.get("formatter"))
+        self.modules = dict()
+        self.directories = dict()
+        self.snapshot()
+
+    #
+    # change detection
+    #
+
+    @staticmethod
+    def _registry_modules() -> dict[str, Path]:
+        out = dict()
+        for cls in list(TypeMetaclass.by_class_name.values()):
+            module = sys.modules.get(cls.__module__)
+            file_name = getattr(module, "__file__", None)
+            if file_name and cls.__module__ not in out:
+                out[cls.__module__] = Path(file_name)
+        return out
+
+    @staticmethod
+    def _resolvers() -> list[DirectoryResolver]:
+        return [r for r in TypeMetaclass.resolvers if isinstance(r, DirectoryResolver) and not isinstance(r, GeneratedResolver)]
+
+    @staticmethod
+    def _mtime(path: Path) -> int or None:
+        try:
+            return path.stat().st_mtime_ns
+        except OSError:
+            return None
+
+    def _directory_state(self, directory: Path) -> tuple:
+        # components are added/removed/renamed: this changes the mtime of the directory containing them
+        return tuple((root, self._mtime(Path(root))) for root, dirs, files in sorted(os.walk(directory)))
+
+    def snapshot(self):
+        """Record the current state of all watched files and directories"""
+        self.modules = {name: self._mtime(path) for name, path in self._registry_modules().items()}
+        self.directories = {r.directory: self._directory_state(r.directory) for r in self._resolvers()}
+
+    def changes(self) -> tuple[set[str], set[Path]]:
+        """Names of changed modules and changed resolver directories since the last snapshot"""
+        modules = {name for name, path in self._registry_modules().items() if self._mtime(path) != self.modules.get(name)}
+        directories = {r.directory for r in self._resolvers() if self._directory_state(r.directory) != self.directories.get(r.directory)}
+        return modules, directories
+
+    #
+    # reloading
+    #
+
+    @staticmethod
+    def _dependents(modules: set[str]) -> set[str]:
+        """Registry modules that (directly or indirectly) import names from any of the given modules"""
+        registry = {cls.__module__ for cls in TypeMetaclass.by_class_name.values()}
+        out = set(modules)
+        while True:
+            found = set()
+            for name in registry - out:
+                for value in list(getattr(sys.modules.get(name), "__dict__", {}).values()):
+                    source = value.__name__ if isinstance(value, types.ModuleType) else getattr(value, "__module__", None)
+                    if source in out:
+                        found.add(name)
+                        break
+            if not found:
+                return out
+            out |= found
+
+    def reload(self, modules: set[str]) -> list[str]:
+        """
+        Reload modules (and their dependents) in import order, purging their classes from the registry first
+
+        :return: names of the reloaded modules
+        """
+        if "__main__" in modules:
+            warnings.warn("Changes to the __main__ module can not be reloaded, restart to pick them up")
+        modules = self._dependents(modules) - {"__main__"}
+        ordered = [name for name in sys.modules if name in modules]
+        order = [class_key(cls) for cls in TypeMetaclass.to_generate]
+
+        TypeMetaclass.in_reload = True
+        try:
+            for name in ordered:
+                TypeMetaclass.purge(name)
+                importlib.reload(sys.modules[name])
+        finally:
+            TypeMetaclass.in_reload = False
+
+        # keep the original generation order so routes.js does not change order
+        position = {key: n for n, key in enumerate(order)}
+        items = sorted(TypeMetaclass.to_generate.items(), key=lambda i: position.get(class_key(i[0]), len(position)))
+        TypeMetaclass.to_generate.clear()
+        TypeMetaclass.to_generate.update(items)
+        return ordered
+
+    #
+    # main loop
+    #
+
+    def sync(self, modules: set[str], directories: set[Path]) -> list[str]:
+        """
+        Reload changed code and rescan changed resolver directories
+
+        :return: names of the reloaded modules
+        """
+        reloaded = self.reload(modules) if modules else []
+        for r in self._resolvers():
+            if r.directory in directories:
+                r.rescan()
+        return reloaded
+
+    def rebuild(self, modules: set[str], directories: set[Path]) -> dict:
+        """Reload changed code, rescan changed directories and regenerate impacted components"""
+        reloaded = self.sync(modules, directories)
+        rc = generate_code(self.location, incremental=True, **self.generate_options)
+        rc["reloaded"] = reloaded
+        return rc
+
+    def step(self) -> dict or None:
+        """
+        Check for changes once (waiting for changes to settle if there are any)
+
+        :return: the generate_code report if a rebuild was done, otherwise None
+        """
+        modules, directories = self.changes()
+        if not modules and not directories:
+            return None
+
+        # debounce: keep collecting changes until nothing changed for `debounce` seconds
+        while True:
+            self.snapshot()
+            time.sleep(self.debounce)
+            more_modules, more_directories = self.changes()
+            if not more_modules and not more_directories:
+                break
+            modules |= more_modules
+            directories |= more_directories
+
+        rc = self.rebuild(modules, directories)
+        self.snapshot()
+        return rc
+
+    def run(self, on_rebuild: callable = None):
+        """Watch until interrupted, calling on_rebuild with each generate_code report"""
+        try:
+            while True:
+                rc = self.step()
+                if rc is not None and on_rebuild:
+                    on_rebuild(rc)
+                time.sleep(self.interval)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.generate_options["formatter"].close()
+
+
+def _print_report(rc):
+    rebuilt = ", ".join(sorted(i.name for i in rc.get("rebuilt", {}))) or "nothing"
+    print(f"reloaded {', '.join(rc['reloaded']) or 'no modules'}: regenerated {rebuilt}")
+
+
+def watch(location: Path, debounce: float = 0.3, interval: float = 0.5, on_rebuild: callable = _print_report, **generate_options):
+    """
+    Generate all components (incrementally) and then keep regenerating them as the code changes until interrupted
+
+    :param location: default directory for generated files (as for generate_code)
+    :param debounce: seconds without further changes to wait for before rebuilding
+    :param interval: seconds between checks for changes
+    :param on_rebuild: called with the generate_code report after each rebuild
+    :param generate_options: other options passed to generate_code
+    """
+    watcher = Watcher(location, debounce=debounce, interval=interval, **generate_options)
+    generate_code(location, incremental=True, **watcher.generate_options)
+    watcher.run(on_rebuild=on_rebuild)
@@ -0,0 +1,43 @@
+"""
+Benchmark of the hybrid encoder (C encoder for plain JSON) against the pure python encoder
+
+Run with ``python -m semantik.test.bench_encoder [--rows N] [--repeat N]``. Prints the best time per encode for each payload
+and the speedup of the hybrid mode (the output of both modes is checked to be identical first).
+"""
+
+import argparse
+import datetime
+import timeit
+
+from semantik.generate.javascript import js
+from semantik.utils import encoder
+
+
+def payloads(rows: int) -> dict:
+    """Payloads from plain JSON to data with many values the C encoder hands back to the python encoder"""
+    plain = [{"id": i, "name": f"item {i}", "values": [i * 0.5, i, None, True], "nested": {"a": "é", "b": [1, 2, 3]}} for i in range(rows)]
+    some_dates = [dict(row, when=datetime.date(2020, 1, 1) if i % 50 == 0 else None) for i, row in enumerate(plain)]
+    expressions = [dict(row, click=js.handlers[i]) for i, row in enumerate(plain)]
+    return {"plain JSON": plain, "2% dates": some_dates, "expression per row": expressions}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("--rows", type=int, default=20000, help="number of rows in each payload")
+    parser.add_argument("--repeat", type=int, default=5, help="number of timed encodes (the best is reported)")
+    args = parser.parse_args()
+
+    pure = encoder.JSONEncoder()
+    hybrid = encoder.JSONEncoder(hybrid=True)
+    if not hybrid.hybrid:
+        raise SystemExit("the C encoder is not available, there is nothing to compare")
+
+    print(f"{'payload':<20} {'pure':>10} {'hybrid':>10} {'speedup':>8}")
+    for name, payload in payloads(args.rows).items():
+        assert pure.encode(payload) == hybrid.encode(payload)
+        times = [min(timeit.repeat(lambda: e.encode(payload), number=1, repeat=args.repeat)) for e in (pure, hybrid)]
+        print(f"{name:<20} {times[0]:>9.4f}s {times[1]:>9.4f}s {times[0] / times[1]:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
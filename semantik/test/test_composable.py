@@ -0,0 +1,82 @@
+"""
+Lazily merged composables must behave like the eagerly merged implementation they replaced (differential check on random
+sequences of merges and changes)
+"""
+
+import random
+
+from semantik.core.composable import Composable
+
+
+class EagerComposable:
+    """The composable before merging was made lazy (without setup code)"""
+
+    def __init__(self):
+        self.props = dict()
+        self.imports = {"import * as vue from 'vue'": None}
+        self.components = set()
+        self.included = set()
+
+    def __add__(self, other):
+        cg = EagerComposable()
+        cg += self
+        cg += other
+        return cg
+
+    def __iadd__(self, other):
+        self.props = self.props | other.props
+        self.imports |= other.imports
+        self.components = self.components.union(other.components)
+        self.included = self.included.union(other.included)
+        return self
+
+
+def contents(c):
+    return dict(c.props), list(c.imports), set(c.components), set(c.included)
+
+
+def change(c, rng):
+    key = rng.choice("abcdefgh")
+    what = rng.randrange(6)
+    if what == 0:
+        c.props[key] = rng.randrange(100)
+    elif what == 1:
+        c.imports[f"import {key} from '{key}'"] = None
+    elif what == 2:
+        c.components.add(key.upper())
+    elif what == 3:
+        c.included.add(key)
+    elif what == 4:
+        c.components = c.components.union({key.upper() + "x"})
+    else:
+        c.props = c.props | {key: -1}
+
+
+def test_lazy_merges_match_eager_merges():
+    rng = random.Random(4321)
+    for _ in range(200):
+        lazy, eager = [], []
+        for _ in range(rng.randint(20, 60)):
+            what = rng.randrange(5)
+            if what == 0 or len(lazy) < 2:
+                lazy.append(Composable())
+                eager.append(EagerComposable())
+            elif what == 1:
+                i, j = rng.randrange(len(lazy)), rng.randrange(len(lazy))
+                lazy[i] += lazy[j]
+                eager[i] += eager[j]
+            elif what == 2:
+                i, j = rng.randrange(len(lazy)), rng.randrange(len(lazy))
+                lazy.append(lazy[i] + lazy[j])
+                eager.append(eager[i] + eager[j])
+            elif what == 3:
+                i = rng.randrange(len(lazy))
+                state = rng.getstate()
+                change(lazy[i], rng)
+                rng.setstate(state)
+                change(eager[i], rng)
+            else:
+                i = rng.randrange(len(lazy))
+                assert contents(lazy[i]) == contents(eager[i])
+        for lc, ec in zip(lazy, eager):
+            assert contents(lc) == contents(ec)
@@ -0,0 +1,81 @@
+"""
+Only templates that really refer to a parent are left out of the compose cache (and classes that compose in python opt in)
+"""
+
+import pytest
+
+from semantik.core.compose_cache import ComposeCache, refers_to_parent
+from semantik.core.type import Type
+
+
+@pytest.mark.parametrize(
+    "template",
+    [
+        '<input v-model="{& parent_model &}.{& type.model &}" type="text"/>',
+        '<div class="transparent">{& type.label &}</div>',
+        "<p>the parent of this component</p>",
+        "{& type.apparent &}",
+    ],
+)
+def test_cacheable(template):
+    assert not refers_to_parent(template)
+
+
+@pytest.mark.parametrize(
+    "template",
+    [
+        "<div>{& type.parent.name &}</div>",
+        "{% if parent %}<p/>{% endif %}",
+        '{& type["parent"].name &}',
+        "{% for item in type.parent.items %}{& item &}{% endfor %}",
+    ],
+)
+def test_uncacheable(template):
+    assert refers_to_parent(template)
+
+
+class ModelLabel(Type):
+    template = "<b/>"
+
+    def compose(self, **kwargs):
+        composable, _ = super().compose(**kwargs)
+        return composable, f"<b>{self.parent.model}</b>"
+
+
+class OptedInModelLabel(ModelLabel):
+    _compose_cache = True
+
+
+class FirstModel(Type):
+    model = "one"
+    child_class = ModelLabel
+    template = "<div>{& use(type.child) &}</div>"
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.child = self.child_class(parent=self)
+
+
+class SecondModel(FirstModel):
+    model = "two"
+
+
+def test_compose_overrides_are_not_cached():
+    with ComposeCache() as cache:
+        assert FirstModel().compose()[1] == "<div><b>one</b></div>"
+        assert SecondModel().compose()[1] == "<div><b>two</b></div>"
+    assert cache.stats["hits"] == 0 and cache.stats["uncacheable"] == 2
+
+
+class OptedInFirstModel(FirstModel):
+    child_class = OptedInModelLabel
+
+
+class OptedInSecondModel(SecondModel):
+    child_class = OptedInModelLabel
+
+
+def test_compose_overrides_can_opt_in():
+    with ComposeCache() as cache:
+        assert OptedInFirstModel().compose()[1] == OptedInSecondModel().compose()[1] == "<div><b>one</b></div>"
+    assert cache.stats["hits"] == 1
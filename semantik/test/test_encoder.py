@@ -0,0 +1,105 @@
+"""
+The hybrid encoder (C encoder for plain JSON) must give exactly the output of the pure python encoder (differential check on
+random payloads)
+"""
+
+import datetime
+import enum
+import io
+import random
+
+import pytest
+
+from semantik.generate.javascript import js
+from semantik.utils import encoder
+
+pytestmark = pytest.mark.skipif(encoder.c_hybrid_make_encoder is None, reason="the C encoder is not available")
+
+
+class Expression:
+    def __init__(self, value):
+        self.value = value
+
+    def _as_javascript(self):
+        return f"f({self.value})"
+
+
+class Level(enum.IntEnum):
+    LOW = 1
+
+
+def atom(rng):
+    return rng.choice(
+        [
+            None,
+            True,
+            False,
+            rng.randint(-(10**20), 10**20),
+            rng.random() * 1e10,
+            float("nan"),
+            float("inf"),
+            -0.0,
+            'é "\\\n x' + str(rng.random()),
+            "plain",
+            datetime.datetime(2020, 1, 2, 3, 4, 5),
+            datetime.date(2021, 5, 6),
+            Expression(rng.randint(0, 9)),
+            js.x.y,
+            Level.LOW,
+        ]
+    )
+
+
+def payload(rng, depth=0):
+    r = rng.random()
+    if depth > 4 or r < 0.4:
+        return atom(rng)
+    if r < 0.7:
+        return [payload(rng, depth + 1) for _ in range(rng.randint(0, 5))]
+    if r < 0.8:
+        return tuple(payload(rng, depth + 1) for _ in range(rng.randint(0, 3)))
+    keys = ["a", "b é", 1, 2.5, True, None] + ([Expression(1)] if rng.random() < 0.1 else [])
+    return {rng.choice(keys): payload(rng, depth + 1) for _ in range(rng.randint(0, 5))}
+
+
+def encode(o, hybrid, **kwargs):
+    try:
+        return encoder.JSONEncoder(hybrid=hybrid, **kwargs).encode(o)
+    except Exception as e:
+        return type(e), str(e)
+
+
+@pytest.mark.parametrize("kwargs", [{}, {"ensure_ascii": False}, {"allow_nan": False}, {"separators": (",", ":")}])
+def test_hybrid_matches_pure(kwargs):
+    rng = random.Random(2024)
+    for _ in range(1000):
+        o = payload(rng)
+        assert encode(o, True, **kwargs) == encode(o, False, **kwargs), o
+
+
+def dump(o, **kwargs):
+    fp = io.StringIO()
+    encoder.JSONEncoder(hybrid=True, **kwargs).dump(o, fp, chunk_size=64)
+    return fp.getvalue()
+
+
+def test_hybrid_dump_matches_pure():
+    rng = random.Random(7)
+    for _ in range(200):
+        o = [payload(rng) for _ in range(rng.randint(0, 20))]
+        assert dump(o) == encode(o, False), o
+
+
+def test_hybrid_dump_with_skipped_keys():
+    rng = random.Random(11)
+    for _ in range(50):
+        o = {(i,) if rng.random() < 0.9 else str(i): payload(rng) for i in range(rng.randint(0, 150))}
+        assert dump(o, skipkeys=True) == encode(o, False, skipkeys=True), o
+    o = {**{(i,): i for i in range(100)}, "z": 1}
+    assert dump(o, skipkeys=True) == encode(o, True, skipkeys=True) == '{"z": 1}'
+
+
+def test_hybrid_circular_reference():
+    o = [1]
+    o.append(o)
+    assert encode(o, True) == encode(o, False)
@@ -0,0 +1,51 @@
+"""
+Formatter results that failed must not be cached, cached results are returned without starting the formatter
+"""
+
+import json
+
+from semantik.generate.formatter import CachingFormatter, Formatter, WorkerFormatter
+
+
+class FlakyFormatter(Formatter):
+    name = "flaky"
+
+    def __init__(self):
+        super().__init__()
+        self.broken = True
+
+    def _format_many(self, items):
+        return [None if self.broken else text.upper() for text, _ in items]
+
+
+def test_failures_are_not_cached(tmp_path):
+    inner = FlakyFormatter()
+    formatter = CachingFormatter(inner, directory=tmp_path)
+    assert formatter.format("abc") == ""
+    assert inner.stats["failures"] == 1
+
+    inner.broken = False
+    assert formatter.format("abc") == "ABC"
+    assert formatter.format("abc") == "ABC"
+    assert formatter.cache_stats == dict(hits=1, misses=2, evictions=0)
+
+
+def test_cache_hits_do_not_start_the_worker(tmp_path, monkeypatch):
+    prettier = tmp_path / "project" / "node_modules" / "prettier"
+    prettier.mkdir(parents=True)
+    (prettier / "package.json").write_text(json.dumps(dict(name="prettier", version="3.0.0")))
+    monkeypatch.chdir(tmp_path / "project")
+    monkeypatch.setattr("shutil.which", lambda name: "/usr/bin/" + name)
+    items = [("<template><div/></template>", "a.vue"), ("export default 1", "b.js")]
+
+    cold = WorkerFormatter()
+    monkeypatch.setattr(cold, "_format_many", lambda batch: [text + "\n" for text, _ in batch])
+    with CachingFormatter(cold, directory=tmp_path / "cache") as formatter:
+        formatter.format_many(items)
+    assert formatter.formatter.cache_key == "worker-3.0.0"
+
+    warm = WorkerFormatter()
+    with CachingFormatter(warm, directory=tmp_path / "cache") as formatter:
+        assert formatter.format_many(items) == [text + "\n" for text, _ in items]
+    assert formatter.cache_stats["hits"] == 2
+    assert warm.stats["spawns"] == 0 and warm.process is None and warm.fallback.version is None
@@ -0,0 +1,44 @@
+"""
+In "import" mode hoisted literals are written next to the components that import them
+"""
+
+import sys
+
+from semantik.core.type import TypeMetaclass
+from semantik.generate.generate import generate_code
+
+MODULE = """
+from pathlib import Path
+from semantik.core.type import Type, generate
+from semantik.generate.javascript import dumps
+
+ROWS = [{"id": i, "name": f"row {i}"} for i in range(50)]
+
+
+@generate
+class DefaultLocation(Type):
+    template = '''<div :rows="{& dumps(type.rows) &}"/>'''
+    rows = ROWS
+
+
+@generate(Path(__file__).parent / "elsewhere")
+class OtherLocation(DefaultLocation):
+    pass
+"""
+
+
+def test_data_files_next_to_components(tmp_path, monkeypatch):
+    (tmp_path / "literals_module.py").write_text(MODULE)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    import literals_module  # noqa: F401
+
+    try:
+        rc = generate_code(tmp_path / "generated", formatter="python", hoist_literals=100, literal_mode="import")
+        (name,) = rc["literals"][tmp_path / "generated" / "DefaultLocation.vue"]
+        for directory in (tmp_path / "generated", tmp_path / "elsewhere"):
+            component = next(directory.glob("*.vue")).read_text()
+            assert f"import {name} from './{name}.json'" in component
+            assert (directory / f"{name}.json").is_file()
+    finally:
+        TypeMetaclass.purge("literals_module")
+        sys.modules.pop("literals_module", None)
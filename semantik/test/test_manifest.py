@@ -0,0 +1,87 @@
+"""
+Incremental generation skips components whose inputs did not change and rebuilds the others (with the reason)
+"""
+
+import os
+import sys
+
+import pytest
+
+from semantik.core.type import TypeMetaclass
+from semantik.generate.generate import generate_code
+from semantik.generate.watch import Watcher
+
+MODULE = """
+from semantik.core.type import Type, generate
+
+
+class Child(Type):
+    template = "<span>child</span>"
+
+
+@generate
+class Parent(Type):
+    template = "<div>{& use(type.child) &}</div>"
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.child = Child(parent=self)
+
+
+@generate
+class Other(Type):
+    template = "<p>other</p>"
+"""
+
+
+@pytest.fixture
+def project(tmp_path, monkeypatch):
+    monkeypatch.setattr(sys, "dont_write_bytecode", True)  # edits must be picked up even within the mtime resolution
+    (tmp_path / "manifest_module.py").write_text(MODULE)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    import manifest_module  # noqa: F401
+
+    yield tmp_path
+    TypeMetaclass.purge("manifest_module")
+    sys.modules.pop("manifest_module", None)
+
+
+def generate(project):
+    rc = generate_code(project / "generated", incremental=True, formatter="python")
+    return {p.name: reason for p, reason in rc["rebuilt"].items()}, sorted(p.name for p in rc["skipped"])
+
+
+def edit(project, old, new):
+    module = project / "manifest_module.py"
+    module.write_text(module.read_text().replace(old, new))
+    Watcher(project / "generated", formatter="python").reload({"manifest_module"})
+
+
+def test_unchanged_run_skips_everything(project):
+    assert generate(project) == ({"Parent.vue": "not in manifest", "Other.vue": "not in manifest"}, [])
+    assert generate(project) == ({}, ["Other.vue", "Parent.vue"])
+
+
+def test_source_changes_rebuild(project):
+    generate(project)
+    edit(project, "<p>other</p>", "<p>another</p>")
+    assert generate(project) == ({"Other.vue": "class source changed"}, ["Parent.vue"])
+    assert "another" in (project / "generated" / "Other.vue").read_text()
+
+    edit(project, "<span>child</span>", "<span>changed child</span>")
+    assert generate(project) == ({"Parent.vue": "dependency source changed"}, ["Other.vue"])
+
+    edit(project, "class Other(Type):\n", "class Other(Type):\n    css_class = 'x'\n")
+    assert generate(project) == ({"Other.vue": "class source changed"}, ["Parent.vue"])
+
+
+def test_modified_or_missing_output_rebuilds(project):
+    generate(project)
+    other = project / "generated" / "Other.vue"
+    st = other.stat()
+    os.utime(other, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    assert generate(project) == ({"Other.vue": "output file modified or missing"}, ["Parent.vue"])
+
+    (project / "generated" / "Parent.vue").unlink()
+    assert generate(project) == ({"Parent.vue": "output file modified or missing"}, ["Other.vue"])
+    assert (project / "generated" / "Parent.vue").is_file()
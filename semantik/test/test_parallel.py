@@ -0,0 +1,100 @@
+"""
+Generating with worker processes must write exactly the files a serial run writes
+"""
+
+import sys
+
+import pytest
+
+from semantik.core.type import TypeMetaclass
+from semantik.generate.generate import generate_code
+
+MODULE = """
+from pathlib import Path
+from semantik.core.composable import Composable
+from semantik.core.resolve import DirectoryResolver
+from semantik.core.type import Type, parameter, slot, generate, route
+from semantik.generate import code
+from semantik.generate.javascript import js, dumps
+
+ROWS = [{"id": i, "name": f"row {i}"} for i in range(100)]
+
+
+class Form(Type):
+    default: slot()
+    model: parameter(str, True)
+    template = '''
+    <div class="form">
+        {% for field in type.default %}
+        <div class="row">
+            {% if field.label %}<label>{& field.label &}</label>{% endif %}
+            {& use(field, model=type.model) &}
+            <my-widget/>
+        </div>
+        {% endfor %}
+    </div>
+    '''
+
+    def compose(self, **kwargs):
+        composable = Composable()
+        composable.props |= {self.model: js.Object}
+        composable.setup += code.Const(vars=["rows"], value=js.vue.ref(ROWS))
+        new_composable, rendered = super().compose(**kwargs)
+        return composable + new_composable, rendered
+
+
+class Input(Type):
+    model: parameter(str, True)
+    label: parameter(str) = ""
+    template = '''<input v-model="{& parent_model &}.{& type.model &}" :data-rows="{& dumps(type.rows) &}"/>'''
+    rows = ROWS[:10]
+    _compose_cache = True
+
+    def compose(self, model=None):
+        return super().compose(parent_model=model)
+
+
+@route
+@generate
+class FirstView(Form):
+    model = "first"
+
+    class A(Input):
+        model = "a"
+        label = "A"
+
+    class B(Input):
+        model = "b"
+
+
+@generate
+class SecondView(Type):
+    template = "<div><first-view/><my-widget/></div>"
+
+
+DirectoryResolver(Path(__file__).parent / "components")
+"""
+
+
+@pytest.mark.parametrize(
+    "options",
+    [dict(), dict(compose_cache=True, hoist_literals=100, literal_mode="import"), dict(hoist_literals=100, literal_mode="parse")],
+)
+def test_workers_write_the_same_files(tmp_path, monkeypatch, options):
+    (tmp_path / "components").mkdir()
+    (tmp_path / "components" / "MyWidget.vue").write_text("")
+    (tmp_path / "parallel_module.py").write_text(MODULE)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    import parallel_module  # noqa: F401
+
+    try:
+        generate_code(tmp_path / "serial", formatter="python", **options)
+        generate_code(tmp_path / "parallel", formatter="python", workers=2, **options)
+    finally:
+        TypeMetaclass.purge("parallel_module")
+        sys.modules.pop("parallel_module", None)
+
+    serial = {p.relative_to(tmp_path / "serial"): p.read_bytes() for p in (tmp_path / "serial").rglob("*") if p.is_file()}
+    parallel = {p.relative_to(tmp_path / "parallel"): p.read_bytes() for p in (tmp_path / "parallel").rglob("*") if p.is_file()}
+    assert len(serial) > 2
+    assert serial == parallel
@@ -0,0 +1,56 @@
+"""
+Templates compiled ahead of time are loaded from the precompiled package, changed templates are compiled as usual
+"""
+
+import json
+
+import jinja2
+import pytest
+
+from semantik.core import template
+from semantik.core.type import Type
+
+
+class Greeting(Type):
+    template = "<p>{& type.greeting &}{% if type.loud %}!{% endif %}</p>"
+    greeting = "hello"
+    loud = True
+
+
+def load(cls, text=None):
+    template.templates.clear()
+    return template.templates.get(cls, text or cls.template)
+
+
+@pytest.fixture
+def precompiled():
+    yield
+    template.use_precompiled(None)
+
+
+@pytest.mark.parametrize("zip", [False, True])
+def test_precompiled_templates_are_loaded(tmp_path, precompiled, zip):
+    target = tmp_path / ("templates.zip" if zip else "templates")
+    assert template.precompile(target, classes=[Greeting], zip=zip) == 1
+    template.use_precompiled(target)
+
+    loaded = load(Greeting)
+    assert loaded.name == template.template_name(Greeting, Greeting.template)
+    assert loaded.render(type=Greeting()) == "<p>hello!</p>"
+
+    changed = "<p>{& type.greeting &}?</p>"
+    compiled = load(Greeting, changed)
+    assert compiled.name == "Greeting"
+    assert compiled.render(type=Greeting()) == "<p>hello?</p>"
+
+
+def test_other_jinja2_version_is_ignored(tmp_path, precompiled):
+    target = tmp_path / "templates"
+    template.precompile(target, classes=[Greeting])
+    manifest = target / template.PRECOMPILED_MANIFEST
+    manifest.write_text(json.dumps(dict(json.loads(manifest.read_text()), jinja2="0.0")))
+    assert jinja2.__version__ != "0.0"
+
+    with pytest.warns(UserWarning, match="another jinja2 version"):
+        template.use_precompiled(target)
+    assert load(Greeting).name == "Greeting"
@@ -0,0 +1,27 @@
+"""
+The python formatter must not count brackets inside regular expression literals
+"""
+
+from semantik.generate.pyformat import format_javascript
+
+SOURCE = """const re = /[(]/;
+function check(a, b) {
+const ratio = a / b / (a + 1);
+if (re.test("(")) {
+return /{/.test(a) ? ratio : a.split(/\\//);
+}
+}
+const after = 1;"""
+
+EXPECTED = """const re = /[(]/;
+function check(a, b) {
+  const ratio = a / b / (a + 1);
+  if (re.test("(")) {
+    return /{/.test(a) ? ratio : a.split(/\\//);
+  }
+}
+const after = 1;"""
+
+
+def test_regex_literals():
+    assert format_javascript(SOURCE) == EXPECTED
@@ -0,0 +1,49 @@
+"""
+Reloading a registry module must not leave the resolvers it created behind
+"""
+
+import sys
+
+from semantik.core.type import TypeMetaclass
+from semantik.generate.watch import Watcher
+
+MODULE = """
+from pathlib import Path
+from semantik.core.type import Type, generate
+from semantik.core.resolve import DirectoryResolver, resolver
+
+
+@generate
+class ReloadedView(Type):
+    template = "<div><my-widget/></div>"
+
+
+DirectoryResolver(Path(__file__).parent / "components")
+
+
+@resolver
+def resolve_nothing(tag_name):
+    return None
+"""
+
+
+def test_resolver_chain_stays_flat_across_reloads(tmp_path, monkeypatch):
+    (tmp_path / "components").mkdir()
+    (tmp_path / "components" / "MyWidget.vue").write_text("")
+    (tmp_path / "reloaded_module.py").write_text(MODULE)
+    monkeypatch.syspath_prepend(str(tmp_path))
+
+    before = len(TypeMetaclass.resolvers)
+    import reloaded_module  # noqa: F401
+
+    try:
+        watcher = Watcher(tmp_path / "generated", formatter="python")
+        sizes = [len(TypeMetaclass.resolvers)]
+        for _ in range(3):
+            watcher.reload({"reloaded_module"})
+            sizes.append(len(TypeMetaclass.resolvers))
+        assert sizes == [before + 2] * 4
+        assert TypeMetaclass.resolve({"my-widget"}) == {"MyWidget": str(tmp_path / "components" / "MyWidget.vue")}
+    finally:
+        TypeMetaclass.purge("reloaded_module")
+        sys.modules.pop("reloaded_module", None)
@@ -0,0 +1,58 @@
+"""
+`scan_components` must find the same components as `ModifyingTemplateParser` (differential check on random templates)
+"""
+
+import random
+
+from semantik.utils.auto_importer import scan_components, ModifyingTemplateParser
+
+PIECES = [
+    "<div>",
+    "</div>",
+    "<span class='a'>",
+    "</span>",
+    "<br/>",
+    "<MyWidget>",
+    "</MyWidget>",
+    '<my-widget :value="a > b"/>',
+    "<DxDataGrid :columns='[\"x>y\"]'>",
+    '<q-btn\n  flat\n  @click="go">',
+    "<template #item>",
+    "</template>",
+    "<slot/>",
+    '<component :is="cmp"/>',
+    "<!-- <Hidden> -->",
+    "<!DOCTYPE html>",
+    "<script><InScript></script>",
+    "<style>.x > .y { }</style>",
+    "<SCRIPT>let a = '<Nope>'</SCRIPT>",
+    "{{ a < b ? '<Fake>' : c }}",
+    "text ",
+    "\n",
+    " < ",
+    "a<b",
+    "&lt;",
+    '<Item v-for="i in items" :key="i">',
+    "</Item>",
+    "<x-y>",
+    "<p title='>'>",
+    "a='x>y'",
+    " b=c ",
+    "=",
+    "'",
+    "<Unclosed ",
+]
+
+
+def parse(template):
+    parser = ModifyingTemplateParser()
+    parser.feed(template)
+    parser.close()
+    return frozenset(parser.components)
+
+
+def test_scan_components_matches_parser():
+    rng = random.Random(1234)
+    for _ in range(1000):
+        template = "".join(rng.choice(PIECES) for _ in range(rng.randint(1, 25)))
+        assert scan_components(template) == parse(template), template
@@ -0,0 +1,87 @@
+"""
+Numeric buffers and numpy arrays are encoded as javascript typed arrays (literals for small arrays, base64 for large ones)
+"""
+
+import array
+import base64
+import re
+import struct
+
+import pytest
+
+from semantik.utils import encoder
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+requires_numpy = pytest.mark.skipif(numpy is None, reason="numpy is not installed")
+
+PAT_BASE64 = re.compile(r'new (\w+)\(Uint8Array\.from\(atob\("([A-Za-z0-9+/=]*)"\), c => c\.charCodeAt\(0\)\)\.buffer\)')
+
+
+def encode(o):
+    return encoder.JSONEncoder().encode(o)
+
+
+def decode(text, fmt):
+    """Typed array class and values of a base64 encoded typed array (the buffer is little endian)"""
+    m = PAT_BASE64.fullmatch(text)
+    assert m, text
+    data = base64.b64decode(m.group(2))
+    return m.group(1), list(struct.unpack(f"<{len(data) // struct.calcsize(fmt)}{fmt}", data))
+
+
+def test_threshold():
+    items = encoder.TYPED_ARRAY_BASE64_BYTES // 4
+    assert encode(array.array("i", [1, -2, 3])) == "new Int32Array([1, -2, 3])"
+    assert encode(array.array("i", range(items - 1))).startswith("new Int32Array([0, 1, 2, ")
+    assert decode(encode(array.array("i", range(items))), "i") == ("Int32Array", list(range(items)))
+
+
+def test_base64_round_trip():
+    ints = [(-1) ** i * i * 1000003 for i in range(1000)]
+    floats = [i / 7 for i in range(1000)] + [float("inf"), -0.0]
+    assert decode(encode(array.array("i", ints)), "i") == ("Int32Array", ints)
+    assert decode(encode(array.array("d", floats)), "d") == ("Float64Array", floats)
+    assert decode(encode(memoryview(array.array("d", floats))), "d") == ("Float64Array", floats)
+
+
+def test_int64_as_float64():
+    assert encode(array.array("q", [1, -2, 2**40])) == "new Float64Array([1, -2, 1099511627776])"
+    values = list(range(-500, 500))
+    assert decode(encode(array.array("q", values)), "d") == ("Float64Array", [float(v) for v in values])
+
+
+def test_multidimensional_memoryviews_are_lists():
+    assert encode(memoryview(array.array("i", [1, 2, 3, 4])).cast("B").cast("i", (2, 2))) == "[[1, 2], [3, 4]]"
+
+
+@requires_numpy
+def test_numpy_base64_round_trip():
+    values = list(range(-1000, 1000, 3))
+    for dtype, fmt in ((">i4", "i"), (">f8", "d"), ("<i4", "i")):
+        o = numpy.array(values, dtype=dtype)
+        name = "Int32Array" if fmt == "i" else "Float64Array"
+        assert decode(encode(o), fmt) == (name, [float(v) if fmt == "d" else v for v in values])
+    assert decode(encode(memoryview(numpy.array(values, dtype=">i4"))), "i") == ("Int32Array", values)
+
+
+@requires_numpy
+def test_numpy_int64_and_small_arrays():
+    assert encode(numpy.array([1, 2], dtype="int64")) == "new Float64Array([1, 2])"
+    assert decode(encode(numpy.arange(500, dtype="uint64")), "d") == ("Float64Array", [float(v) for v in range(500)])
+    assert encode(numpy.array([1.5, numpy.nan], dtype="float32")) == "new Float32Array([1.5, NaN])"
+    assert encode(numpy.int64(3)) == "3"
+
+
+@requires_numpy
+def test_datetime64_with_nat():
+    o = numpy.array(["2020-01-01T00:00:00", "NaT"], dtype="datetime64[s]")
+    assert encode(o) == "Array.from(new Float64Array([1577836800000.0, NaN]), t => isNaN(t) ? null : new Date(t))"
+
+
+@requires_numpy
+def test_2d_arrays():
+    assert encode(numpy.arange(4, dtype="int32").reshape(2, 2)) == "[new Int32Array([0, 1]), new Int32Array([2, 3])]"
@@ -1,8 +1,46 @@
+import functools
+import re
 from html.parser import HTMLParser
 from .html_and_view_tags import HTML_AND_VUE_TAGS
 
 from ..utils.errors import SKTypeError
 
+PAT_MARKUP = re.compile(
+    r"<!--.*?(?:--\s*>|\Z)"  # comment
+    r"|<[!?][^>]*>?"  # doctype, processing instruction
+    r"|<([a-zA-Z][^\t\n\r\f />\x00]*)"  # start tag name (as matched by HTMLParser)
+    r"(?:[^\s=>]+\s*=+\s*(?:'[^']*'|\"[^\"]*\"|[^\s>'\"][^\s>]*)|[^>])*>?",  # attributes (quoted values may contain >)
+    re.DOTALL,
+)
+RAW_TEXT_ELEMENTS = ("script", "style")  #: elements whose content HTMLParser does not parse as markup
+
+
+@functools.lru_cache(maxsize=4096)
+def scan_components(template: str) -> frozenset[str]:
+    """
+    Names of the components (tags other than HTML and vue built-in tags) used in a template
+
+    Gives the same result as feeding the template to `ModifyingTemplateParser` (tag names keep their original capitalization,
+    comments and the content of script and style elements are skipped) but is much faster and cached per template text.
+    """
+    components = set()
+    i = 0
+    while True:
+        m = PAT_MARKUP.search(template, i)
+        if not m:
+            return frozenset(components)
+        i = m.end()
+        tag = m.group(1)
+        if tag is None or (i == len(template) and not m.group(0).endswith(">")):
+            # not a tag (or a start tag cut off by the end of the template, which HTMLParser gives as text)
+            continue
+        name = tag.lower()
+        if name in RAW_TEXT_ELEMENTS and not m.group(0).endswith("/>"):
+            close = re.compile(r"</\s*%s\s*>" % name, re.IGNORECASE).search(template, i)
+            i = close.end() if close else len(template)
+        if name not in HTML_AND_VUE_TAGS:
+            components.add(tag)
+
 
 class ModifyingTemplateParser(HTMLParser):
     """
@@ -0,0 +1,33 @@
+"""
+Location of on-disk caches
+"""
+
+import os
+import tempfile
+from pathlib import Path
+
+__all__ = ["cache_dir", "write_atomic"]
+
+
+def cache_dir(*parts: str) -> Path:
+    """
+    Directory for a cache (created if needed)
+
+    Caches live under $SEMANTIK_CACHE_DIR or ~/.cache/semantik
+    """
+    base = os.environ.get("SEMANTIK_CACHE_DIR") or Path.home() / ".cache" / "semantik"
+    path = Path(base).joinpath(*parts)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def write_atomic(file_name: Path, content: str or bytes):
+    """Write a file so that concurrent readers see either the old or the new content, never a partial one"""
+    fd, tmp = tempfile.mkstemp(dir=file_name.parent, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb" if isinstance(content, bytes) else "wt") as fp:
+            fp.write(content)
+        os.replace(tmp, file_name)
+    except BaseException:
+        os.unlink(tmp)
+        raise
@@ -1,7 +1,18 @@
 """Implementation of JSONEncoder
 """
 
+import array
+import base64
 import datetime
+import decimal
+import enum
+import functools
+import itertools
+import pathlib
+import secrets
+import struct
+import sys
+import uuid
 
 import re
 
@@ -15,6 +26,19 @@ except ImportError:
 # except ImportError:
 #    c_make_encoder = None
 c_make_encoder = None
+# the C encoder is only used by the hybrid mode (where everything it can not encode is handed back to the python encoder)
+try:
+    from _json import make_encoder as c_hybrid_make_encoder
+except ImportError:
+    c_hybrid_make_encoder = None
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+_PLACEHOLDER_PREFIX = "__sk_%s_" % secrets.token_hex(8)  #: placeholders for values the C encoder hands back (random per process)
+PAT_PLACEHOLDER = re.compile('"%s(\\d+)__"' % _PLACEHOLDER_PREFIX)
 
 ESCAPE = re.compile(r'[\x00-\x1f\\"\b\f\n\r\t]')
 ESCAPE_ASCII = re.compile(r'([\\"]|[^\ -~])')
@@ -33,7 +57,8 @@ for i in range(0x20):
     # ESCAPE_DCT.setdefault(chr(i), '\\u%04x' % (i,))
 
 INFINITY = float("inf")
-FLOAT_REPR = repr
+CHUNK_SIZE = 64 * 1024  #: default number of characters buffered by JSONEncoder.dump before each write
+FLOAT_REPR = float.__repr__  # like the C encoder (repr of float subclasses, e.g. numpy.float64, is not a number)
 
 
 def encode_basestring(s):
@@ -73,6 +98,222 @@ def py_encode_basestring_ascii(s):
 encode_basestring_ascii = c_encode_basestring_ascii or py_encode_basestring_ascii
 
 
+#
+# encoders by type
+#
+
+_encoders = {}  #: type => (function, raw)
+_dispatch = {}  #: type => (function, raw) or None (encoded by the generic rules), resolved through the MRO
+_NATIVE = (str, int, float, list, tuple, dict, type(None))
+_MISSING = object()
+
+
+def register_encoder(typ: type, fn, raw: bool = False):
+    """
+    Register how to encode instances of a type (and of its subclasses unless they have their own encoder)
+
+    Registered encoders are used for values that are not strings, numbers, lists or dicts and have no _as_javascript method,
+    they take the place of ``JSONEncoder.default`` for these types.
+
+    :param typ: the type to encode
+    :param fn: function called with the value, returning a value to encode in its place (or javascript source if `raw`). None
+               removes the encoder of the type
+    :param raw: whether `fn` returns javascript source to be used as is
+    """
+    if fn is None:
+        _encoders.pop(typ, None)
+    else:
+        _encoders[typ] = (fn, raw)
+    _dispatch.clear()
+
+
+def _resolve_encoder(typ: type):
+    entry = None
+    if getattr(typ, "_as_javascript", None) is not None:
+        entry = (_as_javascript, True)
+    elif not any("__getattr__" in base.__dict__ for base in typ.__mro__):
+        # classes with a __getattr__ may provide _as_javascript per instance, they are checked each time
+        for base in typ.__mro__:
+            if base in _NATIVE:
+                break
+            if base in _encoders:
+                entry = _encoders[base]
+                break
+    _dispatch[typ] = entry
+    return entry
+
+
+def _as_javascript(o):
+    return o._as_javascript()
+
+
+def _encode_datetime(o):
+    if o.tzinfo:
+        ds = o.isoformat()
+    else:
+        ds = o.replace(tzinfo=datetime.UTC).isoformat()
+    return "new Date(%r)" % ds  # OG
+
+
+def _encode_date(o):
+    return "new Date(%d, %d, %d)" % (o.year, o.month - 1, o.day)  # OG
+
+
+def _encode_time(o):
+    raise ValueError(f"Times are not supported in EJSON in {o}")
+
+
+def _encode_decimal(o):
+    if o.is_finite():
+        return str(o)
+    if o.is_nan():
+        return "NaN"
+    return "-Infinity" if o.is_signed() else "Infinity"
+
+
+#
+# typed arrays
+#
+
+TYPED_ARRAY_BASE64_BYTES = 1024  #: typed arrays of at least this many bytes are decoded from base64 instead of written as literals
+
+TYPED_ARRAYS = {
+    ("i", 1): "Int8Array",
+    ("u", 1): "Uint8Array",
+    ("i", 2): "Int16Array",
+    ("u", 2): "Uint16Array",
+    ("i", 4): "Int32Array",
+    ("u", 4): "Uint32Array",
+    ("i", 8): "Float64Array",  # numbers (as they would be in JSON), not BigInts
+    ("u", 8): "Float64Array",
+    ("f", 4): "Float32Array",
+    ("f", 8): "Float64Array",
+}
+_FORMAT_KINDS = dict(b="i", h="i", i="i", l="i", q="i", n="i", B="u", H="u", I="u", L="u", Q="u", N="u", f="f", d="f")
+
+
+class _Source:
+    """Javascript source returned by encoders that can not always return raw source"""
+
+    __slots__ = ("text",)
+
+    def __init__(self, text):
+        self.text = text
+
+    def _as_javascript(self):
+        return self.text
+
+
+def _float_literal(v):
+    if isinstance(v, int):
+        return str(v)
+    if v != v:
+        return "NaN"
+    if v == INFINITY:
+        return "Infinity"
+    if v == -INFINITY:
+        return "-Infinity"
+    return FLOAT_REPR(v)
+
+
+def _typed_array(name, data, values):
+    """
+    Javascript for a typed array
+
+    :param name: typed array class
+    :param data: the little endian contents (any contiguous buffer)
+    :param values: function returning the contents as a list of numbers (only called for literals)
+    """
+    data = memoryview(data)
+    if data.nbytes >= TYPED_ARRAY_BASE64_BYTES:
+        encoded = base64.b64encode(data).decode("ascii")
+        return _Source(f'new {name}(Uint8Array.from(atob("{encoded}"), c => c.charCodeAt(0)).buffer)')
+    items = map(_float_literal if name.startswith("Float") else str, values())
+    return _Source(f"new {name}([{', '.join(items)}])")
+
+
+def _encode_array(o):
+    if o.typecode in ("u", "w"):
+        return o.tounicode()
+    name = TYPED_ARRAYS[(_FORMAT_KINDS[o.typecode], o.itemsize)]
+    data = array.array("d", o) if o.itemsize == 8 and o.typecode != "d" else o
+    if sys.byteorder == "big":
+        data = array.array(data.typecode, data)
+        data.byteswap()
+    return _typed_array(name, data, o.tolist)
+
+
+def _byteswap(data, itemsize):
+    swapped = bytearray(len(data))
+    for i in range(itemsize):
+        swapped[i::itemsize] = data[itemsize - 1 - i :: itemsize]
+    return swapped
+
+
+def _encode_memoryview(o):
+    prefix, fmt = (o.format[0], o.format[1:]) if o.format[:1] in ("@", "=", "<", ">", "!") else ("@", o.format)
+    key = (_FORMAT_KINDS.get(fmt), o.itemsize)
+    if o.ndim != 1 or key not in TYPED_ARRAYS:
+        return o.tolist()
+    native = prefix == "@"
+    data = o.cast("B") if native and o.c_contiguous else o.tobytes()
+    if native:
+        values = o.tolist
+        big_endian = sys.byteorder == "big"
+    else:
+        values = functools.partial(struct.unpack, f"{prefix}{len(o)}{fmt}", data)
+        big_endian = prefix in (">", "!") or (prefix == "=" and sys.byteorder == "big")
+    if big_endian:
+        data = _byteswap(data, o.itemsize)
+    if o.itemsize == 8 and key[0] != "f":
+        data = array.array("d", values())
+        if sys.byteorder == "big":
+            data.byteswap()
+    return _typed_array(TYPED_ARRAYS[key], data, values)
+
+
+def _encode_ndarray(o):
+    if o.ndim == 0:
+        return o[()]
+    if o.ndim > 1:
+        return list(o)
+    kind = o.dtype.kind
+    if kind in ("M", "m"):
+        # datetime64 and timedelta64 as milliseconds (NaT as NaN)
+        ms = (o.astype("datetime64[ms]") if kind == "M" else o.astype("timedelta64[ms]")).astype("int64").astype("float64")
+        ms[numpy.isnat(o)] = numpy.nan
+        values = _typed_array("Float64Array", ms, ms.tolist).text
+        return _Source(f"Array.from({values}, t => isNaN(t) ? null : new Date(t))") if kind == "M" else _Source(values)
+    if kind == "f" and o.itemsize == 2:
+        o = o.astype("float32")
+    if (kind, o.itemsize) not in TYPED_ARRAYS:
+        return o.tolist()
+    data = numpy.ascontiguousarray(o, dtype="<f8" if o.itemsize == 8 else o.dtype.newbyteorder("<"))
+    return _typed_array(TYPED_ARRAYS[(kind, o.itemsize)], data, o.tolist)
+
+
+def _encode_numpy_scalar(o):
+    if isinstance(o, numpy.datetime64):
+        return o.astype("datetime64[ms]").item()
+    if isinstance(o, numpy.timedelta64):
+        return None if numpy.isnat(o) else o / numpy.timedelta64(1, "ms")
+    return o.item()
+
+
+register_encoder(datetime.datetime, _encode_datetime, raw=True)
+register_encoder(datetime.date, _encode_date, raw=True)
+register_encoder(datetime.time, _encode_time, raw=True)
+register_encoder(decimal.Decimal, _encode_decimal, raw=True)
+register_encoder(uuid.UUID, str)
+register_encoder(enum.Enum, lambda o: o.value)
+register_encoder(pathlib.PurePath, lambda o: o.as_posix())
+register_encoder(array.array, _encode_array)
+register_encoder(memoryview, _encode_memoryview)
+if numpy is not None:
+    register_encoder(numpy.ndarray, _encode_ndarray)
+    register_encoder(numpy.generic, _encode_numpy_scalar)
+
+
 class JSONEncoder(object):
     """Extensible JSON <http://json.org> encoder for Python data structures.
 
@@ -117,6 +358,7 @@ class JSONEncoder(object):
         separators=None,
         encoding="utf-8",
         default=None,
+        hybrid=False,
     ):
         """Constructor for JSONEncoder, with sensible defaults.
 
@@ -165,6 +407,12 @@ class JSONEncoder(object):
         transformed into unicode using that encoding prior to JSON-encoding.
         The default is UTF-8.
 
+        If hybrid is true, lists and dicts are encoded by the C encoder
+        from the standard library, which hands the values it can not encode
+        (_as_javascript objects, dates and anything for ``.default()``)
+        back to the python encoder. The output is the same as without it.
+        Only used without indent and sort_keys and with UTF-8 encoding.
+
         """
 
         self.skipkeys = skipkeys
@@ -178,6 +426,7 @@ class JSONEncoder(object):
         if default is not None:
             self.default = default
         self.encoding = encoding
+        self.hybrid = hybrid and c_hybrid_make_encoder is not None
 
     def default(self, o):
         """Implement this method in a subclass such that it returns
@@ -217,6 +466,12 @@ class JSONEncoder(object):
                 return encode_basestring_ascii(o)
             else:
                 return encode_basestring(o)
+        if self._use_hybrid(o):
+            try:
+                return self._hybrid_encode(o)
+            except (TypeError, ValueError):
+                # e.g. [key] keys: encode everything in python (this also raises the same errors as the python encoder)
+                pass
         # This doesn't pass the iterator directly to ''.join() because the
         # exceptions aren't as detailed.  The list call should be roughly
         # equivalent to the PySequence_Fast that ''.join() would do.
@@ -225,7 +480,97 @@ class JSONEncoder(object):
             chunks = list(chunks)
         return "".join(chunks)
 
-    def iterencode(self, o, _one_shot=False):
+    def _use_hybrid(self, o):
+        return (
+            self.hybrid
+            and isinstance(o, (list, tuple, dict))
+            and not hasattr(o, "_as_javascript")
+            and self.indent is None
+            and not self.sort_keys
+            and self.encoding == "utf-8"
+        )
+
+    def _hybrid_encode(self, o):
+        """Encode a list or dict with the C encoder, encoding the values it hands back with the python encoder"""
+        pending = []
+
+        def hand_back(value):
+            pending.append(value)
+            return "%s%d__" % (_PLACEHOLDER_PREFIX, len(pending) - 1)
+
+        _encoder = encode_basestring_ascii if self.ensure_ascii else encode_basestring
+        markers = {} if self.check_circular else None
+        c_encoder = c_hybrid_make_encoder(
+            markers,
+            hand_back,
+            _encoder,
+            None,
+            self.key_separator,
+            self.item_separator,
+            False,
+            self.skipkeys,
+            self.allow_nan,
+        )
+        out = "".join(c_encoder(o, 0))
+        if not pending:
+            return out
+
+        _iterencode = self.iterencode(None, _one_shot=True, _iterencoder=True)
+        encoded = [value._as_javascript() if hasattr(value, "_as_javascript") else "".join(_iterencode(value, 0)) for value in pending]
+        return PAT_PLACEHOLDER.sub(lambda m: encoded[int(m.group(1))], out)
+
+    def dump(self, o, fp, chunk_size=CHUNK_SIZE):
+        """Encode the given object and write it to a file-like object
+        (anything with a ``write`` method taking strings).
+
+        The output is the same as ``encode(o)`` but it is never held in
+        memory as a whole: chunks are buffered and written once about
+        ``chunk_size`` characters have accumulated. In hybrid mode the
+        items of a list or dict are encoded in batches of about that size.
+
+        Returns the number of characters written.
+
+        """
+        buffer = []
+        buffered = 0
+        written = 0
+        chunks = self._iterencode_batches(o, chunk_size) if self._use_hybrid(o) else self.iterencode(o)
+        for chunk in chunks:
+            buffer.append(chunk)
+            buffered += len(chunk)
+            if buffered >= chunk_size:
+                fp.write("".join(buffer))
+                written += buffered
+                buffer = []
+                buffered = 0
+        if buffer:
+            fp.write("".join(buffer))
+            written += buffered
+        return written
+
+    def _iterencode_batches(self, o, chunk_size):
+        """Encode a list or dict in batches of items sized to about chunk_size characters (each batch with ``encode``)"""
+        if not o:
+            yield self.encode(o)
+            return
+        is_dict = isinstance(o, dict)
+        items = iter(o.items() if is_dict else o)
+        batch_size = 64
+        separator = "{" if is_dict else "["  # written before the next non-empty batch (skipkeys can empty a whole batch)
+        while True:
+            batch = list(itertools.islice(items, batch_size))
+            if not batch:
+                break
+            text = self.encode(dict(batch) if is_dict else batch)
+            if len(text) > 2:
+                yield separator + text[1:-1]
+                separator = self.item_separator
+            batch_size = max(1, chunk_size * len(batch) // len(text))
+        if separator != self.item_separator:
+            yield separator
+        yield "}" if is_dict else "]"
+
+    def iterencode(self, o, _one_shot=False, _iterencoder=False):
         """Encode the given object and yield each string
         representation as available.
 
@@ -294,6 +639,8 @@ class JSONEncoder(object):
                 self.skipkeys,
                 _one_shot,
             )
+        if _iterencoder:
+            return _iterencode
         return _iterencode(o, 0)
 
 
@@ -462,19 +809,26 @@ def _make_iterencode(
             del markers[markerid]
 
     def _iterencode(o, _current_indent_level):
-        ## OG (added 3 ifs)
-        if hasattr(o, "_as_javascript"):
+        ## OG (registered encoders)
+        entry = _dispatch.get(type(o), _MISSING)
+        if entry is _MISSING:
+            entry = _resolve_encoder(type(o))
+        if entry is not None:
+            fn, raw = entry
+            if raw:
+                yield fn(o)
+                return
+            if markers is not None:
+                markerid = id(o)
+                if markerid in markers:
+                    raise ValueError("Circular reference detected")
+                markers[markerid] = o
+            for chunk in _iterencode(fn(o), _current_indent_level):
+                yield chunk
+            if markers is not None:
+                del markers[markerid]
+        elif hasattr(o, "_as_javascript"):
             yield o._as_javascript()
-        elif isinstance(o, datetime.datetime):
-            if o.tzinfo:
-                ds = o.isoformat()
-            else:
-                ds = o.replace(tzinfo=datetime.UTC).isoformat()
-            yield "new Date(%r)" % ds  # OG
-        elif isinstance(o, datetime.date):
-            yield "new Date(%d, %d, %d)" % (o.year, o.month - 1, o.day)  # OG
-        elif isinstance(o, datetime.time):
-            raise ValueError(f"Times are not supported in EJSON in {o}")
         elif isinstance(o, string_types):
             yield _encoder(o)
         elif o is None:
@@ -1,2 +1,6 @@
 class SKTypeError(ValueError):
     pass
+
+
+class SKDaemonError(RuntimeError):
+    pass
@@ -0,0 +1,91 @@
+"""
+Recursive directory listings revalidated by directory mtimes
+
+Adding, removing or renaming an entry changes the mtime of the directory containing it, so a listing of a directory that was
+saved together with its mtime is still valid as long as the mtime has not changed. A warm scan of a tree therefore costs one
+stat per directory and only the directories that changed are read again.
+"""
+
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+
+from .cache import cache_dir, write_atomic
+
+__all__ = ["list_files"]
+
+LISTING_VERSION = 1
+RACY_SECONDS = 2  #: listings of directories modified this recently are not trusted next time (the mtime may not change again)
+
+
+def _cache_file(directory: Path, suffixes: tuple[str]) -> Path:
+    key = hashlib.sha256(f"{directory.resolve()}\0{','.join(suffixes)}".encode()).hexdigest()
+    return cache_dir("listings") / f"{key}.json"
+
+
+def _load(file_name: Path) -> dict:
+    try:
+        data = json.loads(file_name.read_text())
+    except (OSError, ValueError):
+        return dict()
+    return data.get("directories", dict()) if data.get("version") == LISTING_VERSION else dict()
+
+
+def list_files(directory: Path, suffixes: tuple[str] = (".vue", ".js"), cache: bool = True) -> list[Path]:
+    """
+    All files below a directory with one of the given suffixes (like `directory.glob("**/*<suffix>")`)
+
+    Directories are traversed in sorted order and symlinked directories are not followed.
+
+    :param directory: root of the tree to list
+    :param suffixes: file name suffixes to include
+    :param cache: reuse (and update) the on-disk listing of the tree
+    :return: matching files, grouped by suffix (in the order of `suffixes`) and sorted by path within each group
+    """
+    suffixes = tuple(suffixes)
+    cache_file = _cache_file(directory, suffixes) if cache else None
+    old = _load(cache_file) if cache else dict()
+    new = dict()
+    found = {suffix: [] for suffix in suffixes}
+    now = time.time_ns()
+
+    pending = [""]
+    while pending:
+        relative = pending.pop()
+        path = directory / relative if relative else directory
+        try:
+            mtime = path.stat().st_mtime_ns
+        except OSError:
+            continue
+
+        entry = old.get(relative)
+        if entry is None or entry[0] is None or entry[0] != mtime:
+            files, subdirectories = [], []
+            try:
+                with os.scandir(path) as it:
+                    for i in it:
+                        if i.is_dir(follow_symlinks=False):
+                            subdirectories.append(i.name)
+                        elif i.name.endswith(suffixes):
+                            files.append(i.name)
+            except OSError:
+                continue
+            entry = [None if now - mtime < RACY_SECONDS * 10**9 else mtime, sorted(files), sorted(subdirectories)]
+        new[relative] = entry
+
+        for name in entry[1]:
+            for suffix in suffixes:
+                if name.endswith(suffix):
+                    found[suffix].append(path / name)
+                    break
+        pending.extend(f"{relative}/{name}" if relative else name for name in reversed(entry[2]))
+
+    if cache and new != old:
+        try:
+            write_atomic(cache_file, json.dumps(dict(version=LISTING_VERSION, directory=str(directory), directories=new)))
+        except OSError:
+            pass
+
+    return [file for suffix in suffixes for file in sorted(found[suffix])]